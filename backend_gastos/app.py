@@ -446,7 +446,7 @@ async def create_gasto(gasto: GastoIn, background_tasks: BackgroundTasks, reques
         else:
             # High confidence auto-categorization - proceed directly to sharing
             try:
-                storage.sync_excel()
+                storage.schedule_excel_sync()
             except Exception as e:
                 request_logger.warning("Excel sync failed, but expense was saved", exc_info=True)
 
@@ -522,7 +522,7 @@ async def create_ingreso(ingreso: IngresoIn, background_tasks: BackgroundTasks):
             if matched_expense:
                 # Auto-match found
                 reconcile.mark_as_settled(matched_expense["id"], saved_ingreso["id"], storage)
-                storage.sync_excel()
+                storage.schedule_excel_sync()
                 
                 # Send Telegram notification
                 background_tasks.add_task(
@@ -766,7 +766,7 @@ async def get_category_breakdown(year: Optional[int] = None, month: Optional[int
         if expenses.empty:
             return []
         
-        category_totals = expenses.groupby('categoria')['monto_tu_parte'].sum().reset_index()
+        category_totals = expenses.groupby('categoria', observed=True)['monto_tu_parte'].sum().reset_index()
         category_totals = category_totals.sort_values('monto_tu_parte', ascending=False)
         
         return [
@@ -910,7 +910,7 @@ async def manual_match(match: MatchIn):
         success = reconcile.mark_as_settled(match.expense_id, match.income_id, storage)
         
         if success:
-            storage.sync_excel()
+            storage.schedule_excel_sync()
             return {
                 "success": True,
                 "message": "Expenses matched successfully"
@@ -984,7 +984,7 @@ async def update_category(update: CategoryUpdate):
         })
         
         storage.upsert_row(gasto)
-        storage.sync_excel()
+        storage.schedule_excel_sync()
         
         return {
             "success": True,
@@ -1002,20 +1002,17 @@ async def update_sharing(update: ShareUpdate):
         if not gasto:
             raise HTTPException(status_code=404, detail="Expense not found")
 
-        # Update sharing info
-        monto_total = float(gasto["monto_clp"])
+        # Update sharing info; upsert_row derives monto_tu_parte / monto_tercero from the percentage
         porcentaje = update.porcentaje_compartido
 
         gasto.update({
             "compartido_con": update.compartido_con,
             "porcentaje_compartido": porcentaje,
-            "monto_tercero": monto_total * (porcentaje / 100),
-            "monto_tu_parte": monto_total * ((100 - porcentaje) / 100),
             "settlement_status": "pending" if porcentaje > 0 else ""
         })
 
         storage.upsert_row(gasto)
-        storage.sync_excel()
+        storage.schedule_excel_sync()
 
         return {
             "success": True,
@@ -1084,7 +1081,7 @@ async def delete_expense(gasto_id: str, request: Request):
         )
 
 @app.post("/telegram/webhook")
-async def telegram_webhook(update: Dict[str, Any], request: Request):
+async def telegram_webhook(update: Dict[str, Any], background_tasks: BackgroundTasks, request: Request):
     """Handle Telegram webhook updates with enhanced validation"""
     request_logger = get_request_logger_from_request(request)
 
@@ -1100,7 +1097,9 @@ async def telegram_webhook(update: Dict[str, Any], request: Request):
             "update_content": update  # Log full update for debugging
         })
 
-        await handle_telegram_update(update, storage, categorizer, secret_token)
+        # Acknowledge right away and process after the response, so slow storage or
+        # API calls never push Telegram past its webhook timeout into retries
+        background_tasks.add_task(handle_telegram_update, update, storage, categorizer, secret_token)
         return {"ok": True}
     except Exception as e:
         request_logger.error("Error handling Telegram webhook", exc_info=True)
@@ -2108,6 +2107,12 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error stopping scheduler on shutdown: {e}")
 
+    # Write out any Excel sync still waiting on its debounce timer
+    storage.flush_excel()
+
+    # Release the Telegram client's pooled connections
+    await messenger.aclose()
+
 @app.get("/api/scheduler/status")
 async def get_scheduler_status(request: Request):
     """Get the status of the recurring expense scheduler"""
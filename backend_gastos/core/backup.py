@@ -11,8 +11,9 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 import hashlib
 
-from .paths import DATA_DIR, PARQUET, EXCEL
+from .paths import DATA_DIR, PARQUET, PARQUET_DELTA_DIR, EXCEL
 from .logging_config import main_logger
+from .storage import compact_data, invalidate_cache
 
 logger = main_logger
 
@@ -37,6 +38,9 @@ class BackupManager:
 
             files_backed_up = []
 
+            # Fold pending insert fragments so the base file holds every row
+            compact_data()
+
             # Backup Parquet data file
             if PARQUET.exists():
                 parquet_backup = backup_path / "data.parquet.gz"
@@ -157,6 +161,11 @@ class BackupManager:
             if parquet_backup.exists():
                 with gzip.open(parquet_backup, 'rb') as src, open(PARQUET, 'wb') as dst:
                     shutil.copyfileobj(src, dst)
+
+                # Fragments appended after the backup are not part of it
+                for fragment in PARQUET_DELTA_DIR.glob("*.parquet"):
+                    fragment.unlink(missing_ok=True)
+                invalidate_cache()
                 restored_files.append("data.parquet")
 
             # Restore Excel file
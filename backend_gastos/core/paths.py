@@ -14,6 +14,7 @@ DATA_DIR.mkdir(exist_ok=True)
 
 # Main data files
 PARQUET = DATA_DIR / "movimientos_normalizados.parquet"
+PARQUET_DELTA_DIR = DATA_DIR / "movimientos_delta"  # Append-only insert fragments
 EXCEL = BASE_DIR / "Presupuesto_Auto.xlsx"
 
 # Configuration files
@@ -30,6 +31,7 @@ MODEL_DIR.mkdir(exist_ok=True)
 # Environment variables
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
 
 def ensure_data_dir():
     """Ensure data directory exists"""
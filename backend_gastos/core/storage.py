@@ -3,13 +3,27 @@ Data storage management using parquet files and Excel synchronization.
 Handles all CRUD operations and maintains data consistency.
 """
 import pandas as pd
-import uuid
-from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+import pyarrow.compute as pc
+import os
+import operator
+import atexit
+import functools
+import threading
+import time
+from datetime import date, datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 import logging
 
-from .paths import PARQUET, EXCEL, DATA_DIR
+from .paths import PARQUET, PARQUET_DELTA_DIR, EXCEL, DATA_DIR
+
+# Copy-on-Write makes the copies handed out from the cache cheap: data is only
+# duplicated for the columns a caller actually modifies
+pd.set_option("mode.copy_on_write", True)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,237 +44,795 @@ SCHEMA_COLUMNS = [
     "installment_first_payment_date", "installment_payment_frequency", "installment_remaining_balance"
 ]
 
+SCHEMA_COLUMN_SET = frozenset(SCHEMA_COLUMNS)
+
+# Low-cardinality text columns, kept dictionary-encoded on disk and as
+# pandas categoricals in memory
+CATEGORICAL_COLUMNS = [
+    "categoria", "subcategoria", "estado", "tipo", "moneda", "medio",
+    "fuente", "settlement_status", "recurring_frequency", "installment_payment_frequency"
+]
+CATEGORICAL_COLUMN_SET = frozenset(CATEGORICAL_COLUMNS)
+CATEGORY_TYPE = pa.dictionary(pa.int16(), pa.string())
+
+# Canonical Arrow schema, enforced on every parquet write and read.
+# Counters use the narrowest integer that fits the API bounds (day 1-31, up to
+# 360 installments); amounts and ratios stay float64 so values round-trip exactly
+ARROW_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("fecha", pa.timestamp("ns")),
+    ("descripcion", pa.string()),
+    ("monto_clp", pa.float64()),
+    ("moneda", CATEGORY_TYPE),
+    ("medio", CATEGORY_TYPE),
+    ("compartido_con", pa.string()),
+    ("porcentaje_compartido", pa.float64()),
+    ("mcc", pa.string()),
+    ("categoria", CATEGORY_TYPE),
+    ("subcategoria", CATEGORY_TYPE),
+    ("etiquetas", pa.string()),
+    ("estado", CATEGORY_TYPE),
+    ("fuente", CATEGORY_TYPE),
+    ("ml_confidence", pa.float64()),
+    ("tipo", CATEGORY_TYPE),
+    ("parent_id", pa.string()),
+    ("monto_tu_parte", pa.float64()),
+    ("monto_tercero", pa.float64()),
+    ("settlement_status", CATEGORY_TYPE),
+    ("is_recurring", pa.bool_()),
+    ("recurring_frequency", CATEGORY_TYPE),
+    ("recurring_day", pa.int8()),
+    ("recurring_end_date", pa.timestamp("ns")),
+    ("recurring_template_id", pa.string()),
+    ("recurring_next_date", pa.timestamp("ns")),
+    ("is_installment", pa.bool_()),
+    ("installment_total_amount", pa.float64()),
+    ("installment_total_installments", pa.int16()),
+    ("installment_paid_installments", pa.int16()),
+    ("installment_installment_amount", pa.float64()),
+    ("installment_interest_rate", pa.float64()),
+    ("installment_first_payment_date", pa.timestamp("ns")),
+    ("installment_payment_frequency", CATEGORY_TYPE),
+    ("installment_remaining_balance", pa.float64()),
+])
+
+# Columns grouped by how _ensure_schema coerces them
+DATE_COLUMNS = [field.name for field in ARROW_SCHEMA if pa.types.is_timestamp(field.type)]
+FLOAT_COLUMNS = [field.name for field in ARROW_SCHEMA if pa.types.is_floating(field.type)]
+INT_COLUMNS = {field.name: field.type.to_pandas_dtype() for field in ARROW_SCHEMA if pa.types.is_integer(field.type)}
+BOOL_COLUMNS = [field.name for field in ARROW_SCHEMA if pa.types.is_boolean(field.type)]
+
+# Inputs of the monto_tu_parte / monto_tercero split
+SPLIT_INPUT_COLUMNS = ("monto_clp", "porcentaje_compartido")
+
+# Typed, zero-row frame returned when there is no data yet
+EMPTY_DF = ARROW_SCHEMA.empty_table().to_pandas()
+
+# Sheets written by sync_excel; any other sheet in the workbook belongs to the user
+GENERATED_SHEETS = ("MOVIMIENTOS", "RESUMEN_AUTO", "RESUMEN_CASHFLOW")
+
+# xlsxwriter otherwise runs a URL regex over every string cell; constant_memory
+# is left off because pandas writes cells column by column, which it can't stream
+XLSXWRITER_OPTIONS = {"strings_to_urls": False}
+
+# Mutations schedule the (derived) Excel sync after this many idle seconds,
+# so bursts of changes coalesce into a single workbook write
+EXCEL_SYNC_DELAY = 2.0
+
+_excel_lock = threading.Lock()
+_excel_timer: Optional[threading.Timer] = None
+_excel_timer_lock = threading.Lock()
+
+# (data version, workbook mtime) after our last successful write, so a sync
+# with nothing new to write can return without opening the workbook
+_excel_synced: Optional[tuple] = None
+
+# Rows are written sorted by id in groups of this size, so the per-row-group
+# min/max statistics let parquet readers skip groups on id lookups
+ROW_GROUP_SIZE = 4096
+
+# Parquet write options shared by the base file and insert fragments: zstd at a
+# low level decodes about as fast as snappy while compressing noticeably better
+PARQUET_WRITE_OPTIONS = {"compression": "zstd", "compression_level": 1, "use_dictionary": True}
+
+# New rows are appended as small fragments next to the base parquet file and
+# folded back into it on the next full rewrite, or once there are this many
+MAX_DELTA_FRAGMENTS = 64
+
+# Comparison operators accepted in (column, op, value) read filters; they apply
+# equally to pyarrow dataset fields and pandas columns
+FILTER_OPS = {"=": operator.eq, "==": operator.eq, ">": operator.gt}
+
+# Single-row inserts draw ids from a pool refilled with one entropy read
+ID_POOL_SIZE = 64
+
+_id_pool: List[str] = []
+
+# Last DataFrame read or written, plus a lazily built id -> row position map;
+# every write in this module goes through _save_data/_append_rows, which keep it
+# current, and the files' stamp catches changes made from outside this process
+_CACHE: Dict[str, Any] = {"df": None, "id_idx": None, "version": 0, "stamp": None}
+_cache_lock = threading.RLock()
+
+def _uuid_batch(n: int) -> List[str]:
+    """Generate n random 128-bit hex ids from a single os.urandom call"""
+    raw = os.urandom(16 * n)
+    return [raw[i * 16:(i + 1) * 16].hex() for i in range(n)]
+
+def _new_id() -> str:
+    """Take a fresh id from the pool, refilling it when empty"""
+    try:
+        return _id_pool.pop()
+    except IndexError:
+        _id_pool.extend(_uuid_batch(ID_POOL_SIZE))
+        return _id_pool.pop()
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """Parse dates into the naive nanosecond dtype used by ARROW_SCHEMA"""
+    dates = pd.to_datetime(values, errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.astype("datetime64[ns]")
+
 def _ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
-    """Ensure DataFrame has all required columns with proper types"""
-    for col in SCHEMA_COLUMNS:
-        if col not in df.columns:
-            if col in ["monto_clp", "porcentaje_compartido", "ml_confidence", "monto_tu_parte", "monto_tercero"]:
-                df[col] = 0.0
-            elif col in ["fecha", "recurring_end_date", "recurring_next_date"]:
-                df[col] = pd.NaT
-            elif col in ["is_recurring"]:
-                df[col] = False
-            elif col in ["recurring_day"]:
-                df[col] = 0
-            else:
-                df[col] = ""
+    """
+    Ensure DataFrame has all required columns with proper types.
+    Only needed for external input; parquet reads are typed by ARROW_SCHEMA.
+    """
+    for field in ARROW_SCHEMA:
+        if field.name not in df.columns:
+            df[field.name] = _default_value(field)
 
     # Ensure proper order
     df = df[SCHEMA_COLUMNS]
 
     # Convert types
-    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
-    df["recurring_end_date"] = pd.to_datetime(df["recurring_end_date"], errors="coerce")
-    df["recurring_next_date"] = pd.to_datetime(df["recurring_next_date"], errors="coerce")
-    df["monto_clp"] = pd.to_numeric(df["monto_clp"], errors="coerce").fillna(0.0)
-    df["porcentaje_compartido"] = pd.to_numeric(df["porcentaje_compartido"], errors="coerce").fillna(0.0)
-    df["ml_confidence"] = pd.to_numeric(df["ml_confidence"], errors="coerce").fillna(0.0)
-    df["monto_tu_parte"] = pd.to_numeric(df["monto_tu_parte"], errors="coerce").fillna(0.0)
-    df["monto_tercero"] = pd.to_numeric(df["monto_tercero"], errors="coerce").fillna(0.0)
-    df["is_recurring"] = df["is_recurring"].astype(bool)
-    df["recurring_day"] = pd.to_numeric(df["recurring_day"], errors="coerce").fillna(0).astype(int)
-
-    # Installment purchases fields
-    df["is_installment"] = df["is_installment"].astype(bool)
-    df["installment_total_amount"] = pd.to_numeric(df["installment_total_amount"], errors="coerce").fillna(0.0)
-    df["installment_total_installments"] = pd.to_numeric(df["installment_total_installments"], errors="coerce").fillna(0).astype(int)
-    df["installment_paid_installments"] = pd.to_numeric(df["installment_paid_installments"], errors="coerce").fillna(0).astype(int)
-    df["installment_installment_amount"] = pd.to_numeric(df["installment_installment_amount"], errors="coerce").fillna(0.0)
-    df["installment_interest_rate"] = pd.to_numeric(df["installment_interest_rate"], errors="coerce").fillna(0.0)
-    df["installment_first_payment_date"] = pd.to_datetime(df["installment_first_payment_date"], errors="coerce")
-    df["installment_remaining_balance"] = pd.to_numeric(df["installment_remaining_balance"], errors="coerce").fillna(0.0)
+    for col in DATE_COLUMNS:
+        df[col] = _to_datetime(df[col])
+    for col in FLOAT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+    for col, dtype in INT_COLUMNS.items():
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(dtype)
+    for col in BOOL_COLUMNS:
+        df[col] = df[col].astype(bool)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+        # Missing labels are stored as "", not null, so they never read back as NaN
+        if df[col].hasnans:
+            if "" not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([""])
+            df[col] = df[col].fillna("")
 
     return df
 
-def _load_data() -> pd.DataFrame:
-    """Load data from parquet file or create empty DataFrame"""
+def _default_value(field: pa.Field) -> Any:
+    """Default for a missing column, matching _ensure_schema"""
+    if pa.types.is_timestamp(field.type):
+        return None
+    elif pa.types.is_boolean(field.type):
+        return False
+    elif pa.types.is_integer(field.type):
+        return 0
+    elif pa.types.is_floating(field.type):
+        return 0.0
+    else:
+        return ""
+
+def _default_column(name: str, index: pd.Index) -> pd.Series:
+    """Build a column of default values already in its schema dtype"""
+    dtype = "category" if name in CATEGORICAL_COLUMN_SET else EMPTY_DF.dtypes[name]
+    return pd.Series(DEFAULT_VALUES[name], index=index).astype(dtype)
+
+def _default_array(field: pa.Field, length: int) -> pa.Array:
+    """Build a column of default values matching _ensure_schema"""
+    return pa.array([_default_value(field)] * length, type=field.type)
+
+def _coerce_timestamp(value: Any) -> Any:
+    """Coerce a value for a timestamp column"""
+    value = pd.to_datetime(value, errors="coerce")
+    if value is None or pd.isna(value):
+        return None
+    return value.tz_localize(None) if value.tzinfo is not None else value
+
+def _coerce_bool(value: Any) -> bool:
+    """Coerce a value for a boolean column"""
+    return bool(value) if value is not None else False
+
+def _coerce_float(value: Any) -> float:
+    """Coerce a value for a float column, mapping unparseable and NaN to 0"""
     try:
-        if PARQUET.exists():
-            df = pd.read_parquet(PARQUET)
-            return _ensure_schema(df)
-        else:
-            logger.info("Parquet file doesn't exist, creating empty DataFrame")
-            return _ensure_schema(pd.DataFrame())
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if number == number else 0.0
+
+def _coerce_int(value: Any) -> int:
+    """Coerce a value for an integer column"""
+    return int(_coerce_float(value))
+
+def _coerce_string(value: Any) -> Optional[str]:
+    """Coerce a value for a string column"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+def _coerce_category(value: Any) -> str:
+    """Coerce a value for a categorical column; missing labels become "" since a null would read back as NaN"""
+    value = _coerce_string(value)
+    return "" if value is None else value
+
+def _value_coercer(field: pa.Field):
+    """Pick the coercion function matching how _ensure_schema coerces the field's column"""
+    if pa.types.is_timestamp(field.type):
+        return _coerce_timestamp
+    elif pa.types.is_boolean(field.type):
+        return _coerce_bool
+    elif pa.types.is_integer(field.type):
+        return _coerce_int
+    elif pa.types.is_floating(field.type):
+        return _coerce_float
+    elif pa.types.is_dictionary(field.type):
+        return _coerce_category
+    return _coerce_string
+
+# Per-column coercers and defaults, resolved once instead of re-inspecting the
+# field type for every value written
+COERCERS = {field.name: _value_coercer(field) for field in ARROW_SCHEMA}
+DEFAULT_VALUES = {field.name: _default_value(field) for field in ARROW_SCHEMA}
+
+def _coerce_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a row dict to ARROW_SCHEMA types without building a DataFrame"""
+    return {
+        name: COERCERS[name](row[name]) if name in row else default
+        for name, default in DEFAULT_VALUES.items()
+    }
+
+def _cast_column(column: pa.ChunkedArray, type: pa.DataType) -> pa.ChunkedArray:
+    """Cast a column to type, dictionary-encoding plain strings first"""
+    if pa.types.is_dictionary(type) and not pa.types.is_dictionary(column.type):
+        column = column.cast(type.value_type).dictionary_encode()
+    return column.cast(type)
+
+def _fill_category_nulls(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Replace nulls in a categorical column with "" (older files may contain them)"""
+    return _cast_column(pc.fill_null(column.cast(pa.string()), ""), CATEGORY_TYPE)
+
+def _conform(table: pa.Table) -> pa.Table:
+    """Cast a table read from parquet to ARROW_SCHEMA, adding missing columns and filling categorical nulls"""
+    if not table.schema.equals(ARROW_SCHEMA):
+        columns = [
+            _cast_column(table[field.name], field.type) if field.name in table.column_names
+            else _default_array(field, table.num_rows)
+            for field in ARROW_SCHEMA
+        ]
+        table = pa.Table.from_arrays(columns, schema=ARROW_SCHEMA)
+    for col in CATEGORICAL_COLUMNS:
+        if table[col].null_count:
+            table = table.set_column(table.schema.get_field_index(col), col, _fill_category_nulls(table[col]))
+    return table
+
+def _delta_files() -> List[Path]:
+    """List pending insert fragments in write order (names start with their write time)"""
+    if not PARQUET_DELTA_DIR.exists():
+        return []
+    return sorted(PARQUET_DELTA_DIR.glob("*.parquet"))
+
+def _filter_expression(filters: Optional[List[tuple]]) -> Optional[ds.Expression]:
+    """Turn [(column, op, value), ...] into a dataset filter expression"""
+    expression = None
+    for col, op, value in filters or []:
+        condition = FILTER_OPS[op](ds.field(col), value)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def _read_table(filters: Optional[List[tuple]] = None) -> Optional[pa.Table]:
+    """Read the base parquet file plus insert fragments as a single Arrow table"""
+    files = ([PARQUET] if PARQUET.exists() else []) + _delta_files()
+    if not files:
+        return None
+
+    expression = _filter_expression(filters)
+    tables = []
+    for path in files:
+        # One footer read per file gives both the schema and the row-group statistics
+        dataset = ds.dataset(path, format="parquet")
+        columns = [col for col in SCHEMA_COLUMNS if col in dataset.schema.names]
+        tables.append(_conform(dataset.to_table(columns=columns, filter=expression)))
+    table = pa.concat_tables(tables)
+    return _drop_duplicate_ids(table) if len(tables) > 1 else table
+
+def _drop_duplicate_ids(table: pa.Table) -> pa.Table:
+    """Keep the last copy of each id (a crash after a rewrite but before fragment cleanup leaves two)"""
+    ids = table["id"].to_numpy()
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    if len(last_from_end) == len(ids):
+        return table
+    return table.take(np.sort(len(ids) - 1 - last_from_end))
+
+def _read_data() -> Optional[pd.DataFrame]:
+    """Read every row from parquet, or None if there is no data yet"""
+    table = _read_table()
+    if table is None:
+        return None
+    return table.to_pandas()
+
+def _data_stamp() -> tuple:
+    """Identify the on-disk state: base file mtime plus the pending fragment names"""
+    try:
+        mtime = PARQUET.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    return (mtime, tuple(path.name for path in _delta_files()))
+
+def _cached_frame() -> pd.DataFrame:
+    """
+    Return the cached DataFrame, reading it from parquet on first use.
+    Writes replace the cached frame rather than mutating it, but callers must not mutate it either.
+    """
+    with _cache_lock:
+        stamp = _data_stamp()
+        if _CACHE["df"] is None or _CACHE["stamp"] != stamp:
+            df = _read_data()
+            if df is None:
+                logger.info("Parquet file doesn't exist, creating empty DataFrame")
+                df = EMPTY_DF.copy(deep=False)
+            if _CACHE["df"] is not None:
+                _CACHE["version"] += 1
+            _CACHE["df"] = df
+            _CACHE["id_idx"] = None
+            _CACHE["stamp"] = stamp
+        return _CACHE["df"]
+
+def _id_index() -> Dict[str, int]:
+    """Map each id to its row position in the cached DataFrame"""
+    with _cache_lock:
+        df = _cached_frame()
+        if _CACHE["id_idx"] is None:
+            _CACHE["id_idx"] = dict(zip(df["id"].to_numpy(), range(len(df))))
+        return _CACHE["id_idx"]
+
+def invalidate_cache():
+    """Drop the in-memory copy so the next read goes back to parquet"""
+    with _cache_lock:
+        _CACHE["df"] = None
+        _CACHE["id_idx"] = None
+        _CACHE["version"] += 1
+
+def _load_data(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load data from parquet files or create empty DataFrame, optionally only some columns"""
+    try:
+        df = _cached_frame()
+        # Projecting first means later filters only materialize the columns asked for
+        return df[columns] if columns is not None else df.copy(deep=False)
     except Exception as e:
-        logger.error(f"Error loading parquet: {e}")
-        return _ensure_schema(pd.DataFrame())
+        logger.error("Error loading parquet: %s", e)
+        df = EMPTY_DF.copy(deep=False)
+        return df[columns] if columns is not None else df
 
-def _save_data(df: pd.DataFrame):
-    """Save DataFrame to parquet file"""
+def _cache_warm() -> bool:
+    """Whether reads can be served from memory instead of a filtered parquet scan"""
+    with _cache_lock:
+        return _CACHE["df"] is not None
+
+def _read_rows(filters: List[tuple]) -> pd.DataFrame:
+    """Read only the rows matching filters, pushing the predicate down to parquet"""
+    try:
+        table = _read_table(filters)
+        if table is None:
+            return EMPTY_DF.copy(deep=False)
+        return table.to_pandas()
+    except Exception as e:
+        logger.error("Error reading filtered parquet, falling back to full scan: %s", e)
+        df = _load_data()
+        mask = pd.Series(True, index=df.index)
+        for col, op, value in filters:
+            mask &= FILTER_OPS[op](df[col], value)
+        return df[mask]
+
+def _exists(id: str) -> bool:
+    """Check if a row with the given ID exists without loading the full table"""
+    with _cache_lock:
+        if _CACHE["df"] is not None:
+            return id in _id_index()
+    return len(_read_rows([("id", "=", id)])) > 0
+
+def _serialized(func):
+    """Run func under _cache_lock so its read-modify-write can't interleave with other writers"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _cache_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+def _load_indexed() -> tuple:
+    """Load data together with its id -> row position map, taken from the same cache state"""
+    with _cache_lock:
+        return _load_data(), _id_index()
+
+def _concat_rows(df: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate schema-conformed frames, keeping categorical columns categorical"""
+    df = df.copy(deep=False)
+    new_rows = new_rows.copy(deep=False)
+    for col in CATEGORICAL_COLUMNS:
+        categories = df[col].cat.categories.union(new_rows[col].cat.categories)
+        df[col] = df[col].cat.set_categories(categories)
+        new_rows[col] = new_rows[col].cat.set_categories(categories)
+    return pd.concat([df, new_rows], ignore_index=True)
+
+def _append_rows(table: pa.Table):
+    """Append new rows as a parquet fragment without rewriting the base file"""
+    with _cache_lock:
+        # Only extend the cache in place if it reflects what is on disk right now
+        cache_current = _CACHE["df"] is not None and _CACHE["stamp"] == _data_stamp()
+        try:
+            PARQUET_DELTA_DIR.mkdir(parents=True, exist_ok=True)
+            # Zero-padded timestamp first, so name order is insertion order
+            fragment = PARQUET_DELTA_DIR / f"{time.time_ns():020d}-{_new_id()}.parquet"
+            tmp_path = fragment.with_suffix(".tmp")
+            pq.write_table(table, tmp_path, **PARQUET_WRITE_OPTIONS)
+            os.replace(tmp_path, fragment)
+            logger.info("Appended %s rows to %s", table.num_rows, fragment.name)
+        except Exception as e:
+            logger.error("Error appending parquet fragment: %s", e)
+            raise
+
+        _CACHE["version"] += 1
+        if cache_current:
+            new_rows = table.to_pandas()
+            start = len(_CACHE["df"])
+            _CACHE["df"] = _concat_rows(_CACHE["df"], new_rows)
+            if _CACHE["id_idx"] is not None:
+                _CACHE["id_idx"].update(zip(new_rows["id"].to_numpy(), range(start, start + len(new_rows))))
+            _CACHE["stamp"] = _data_stamp()
+
+    if len(_delta_files()) > MAX_DELTA_FRAGMENTS:
+        compact_data()
+
+def _save_data(df: pd.DataFrame, validated: bool = False):
+    """
+    Save DataFrame to parquet file, sorted by id for row-group pruning; the cached
+    frame keeps the caller's row order. Pass validated=True when df already matches the schema (e.g. it came from the cache).
+    """
     try:
         DATA_DIR.mkdir(exist_ok=True)
-        df = _ensure_schema(df)
-        df.to_parquet(PARQUET, index=False)
-        logger.info(f"Data saved to {PARQUET}")
+        if not validated:
+            df = _ensure_schema(df)
+        table = pa.Table.from_pandas(df, schema=ARROW_SCHEMA, preserve_index=False).sort_by("id")
+
+        with _cache_lock:
+            # Write beside the base file and swap it in, so a crash never leaves a torn file
+            staging = PARQUET.with_name(f".{PARQUET.stem}.tmp.parquet")
+            pq.write_table(table, staging, row_group_size=ROW_GROUP_SIZE, **PARQUET_WRITE_OPTIONS)
+            os.replace(staging, PARQUET)
+
+            # The base file now holds every row, so pending fragments are obsolete
+            for fragment in _delta_files():
+                fragment.unlink(missing_ok=True)
+
+            _CACHE["df"] = df.reset_index(drop=True)
+            _CACHE["id_idx"] = None
+            _CACHE["version"] += 1
+            _CACHE["stamp"] = _data_stamp()
+        logger.info("Data saved to %s", PARQUET)
     except Exception as e:
-        logger.error(f"Error saving parquet: {e}")
+        logger.error("Error saving parquet: %s", e)
         raise
 
-def upsert_row(row: Dict[str, Any]) -> Dict[str, Any]:
-    """Insert or update a row in the dataset"""
-    df = _load_data()
-    
+@_serialized
+def compact_data():
+    """Fold pending insert fragments into the base parquet file"""
+    if _delta_files():
+        _save_data(_load_data(), validated=True)
+
+def _has_amounts(row: Dict[str, Any]) -> bool:
+    """Whether the row carries the inputs of monto_tu_parte / monto_tercero"""
+    return any(col in row for col in SPLIT_INPUT_COLUMNS)
+
+def _fill_split_inputs(row: Dict[str, Any]):
+    """Complete a partial update that carries only one split input with the stored value of the other"""
+    missing = [col for col in SPLIT_INPUT_COLUMNS if col not in row]
+    if len(missing) != 1:
+        return
+    stored = get(row["id"])
+    if stored is not None:
+        row[missing[0]] = stored[missing[0]]
+
+def _prepare_row(row: Dict[str, Any], split: bool = True) -> bool:
+    """Fill in id, fecha and (unless split=False) the split amounts; return whether the row already exists"""
     # Generate ID if not provided
     if not row.get("id"):
-        row["id"] = str(uuid.uuid4())
+        row["id"] = _new_id()
+        exists = False
+    else:
+        exists = _exists(row["id"])
     
-    # Set default fecha if not provided
-    if not row.get("fecha"):
+    # Set default fecha if not provided (a partial update that omits it keeps the stored one)
+    if not row.get("fecha") and (not exists or "fecha" in row):
         row["fecha"] = datetime.now()
     
+    # Partial updates without amounts leave the stored split untouched
+    if not _has_amounts(row):
+        return exists
+    if exists:
+        _fill_split_inputs(row)
+    if not split:
+        return exists
+
     # Calculate monto_tu_parte and monto_tercero
-    monto_clp = float(row.get("monto_clp", 0))
-    porcentaje = float(row.get("porcentaje_compartido", 0))
-    
-    if porcentaje > 0:
-        row["monto_tu_parte"] = monto_clp * (porcentaje / 100)
-        row["monto_tercero"] = monto_clp * ((100 - porcentaje) / 100)
-    else:
-        row["monto_tu_parte"] = monto_clp
-        row["monto_tercero"] = 0.0
-    
-    # Check if row exists
-    existing_idx = df[df["id"] == row["id"]].index
-    
-    if len(existing_idx) > 0:
+    _split_amounts([row])
+
+    return exists
+
+def _split_amounts(rows: List[Dict[str, Any]]):
+    """Set monto_tu_parte and monto_tercero for a batch of rows in one vectorized pass"""
+    # A missing (or stored NaN) input counts as 0
+    monto_clp = np.nan_to_num(np.array([float(row.get("monto_clp", 0)) for row in rows], dtype=np.float64))
+    porcentaje = np.nan_to_num(np.array([float(row.get("porcentaje_compartido", 0)) for row in rows], dtype=np.float64))
+    # porcentaje_compartido is your own share of a shared expense; 0 means not shared. Your
+    # part is taken in whole pesos (CLP has no minor unit) from the percentage in basis points,
+    # and the third party's part is the remainder, so the two always add up to monto_clp
+    shared = porcentaje > 0
+    basis_points = np.round(porcentaje * 100).astype(np.int64)
+    shared_part = (np.round(monto_clp).astype(np.int64) * basis_points // 10000).astype(np.float64)
+    tu_parte = np.where(shared, shared_part, monto_clp)
+    tercero = monto_clp - tu_parte
+    for row, row_tu_parte, row_tercero in zip(rows, tu_parte.tolist(), tercero.tolist()):
+        row["monto_tu_parte"] = row_tu_parte
+        row["monto_tercero"] = row_tercero
+
+def _assign_row(df: pd.DataFrame, row: Dict[str, Any], position: int):
+    """Write the fields present in row onto the row at position in df"""
+    # Coerce only the updated fields, so the rest of the frame stays validated
+    columns = [col for col in row if col in SCHEMA_COLUMN_SET]
+    values = [COERCERS[col](row[col]) for col in columns]
+    # Categoricals only accept known values, so register new ones first
+    for col, value in zip(columns, values):
+        if col in CATEGORICAL_COLUMN_SET and value is not None and value not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([value])
+    df.loc[df.index[position], columns] = values
+
+@_serialized
+def upsert_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert or update a row in the dataset"""
+    if _prepare_row(row):
         # Update existing row
-        for key, value in row.items():
-            if key in SCHEMA_COLUMNS:
-                df.loc[existing_idx[0], key] = value
-        logger.info(f"Updated row with id: {row['id']}")
+        df, id_idx = _load_indexed()
+        _assign_row(df, row, id_idx[row["id"]])
+        _save_data(df, validated=True)
+        logger.info("Updated row with id: %s", row['id'])
     else:
-        # Insert new row
-        new_row = pd.DataFrame([row])
-        new_row = _ensure_schema(new_row)
-        df = pd.concat([df, new_row], ignore_index=True)
-        logger.info(f"Inserted new row with id: {row['id']}")
-    
-    _save_data(df)
+        # Insert new row as an append-only fragment
+        _append_rows(pa.Table.from_pylist([_coerce_row(row)], schema=ARROW_SCHEMA))
+        logger.info("Inserted new row with id: %s", row['id'])
+
     return row
 
+@_serialized
+def upsert_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert or update several rows with a single write: one rewrite if anything is updated, else one fragment"""
+    inserts = []
+    updates = []
+    for row in rows:
+        (updates if _prepare_row(row, split=False) else inserts).append(row)
+    priced = [row for row in rows if _has_amounts(row)]
+    if priced:
+        _split_amounts(priced)
+
+    new_rows = pa.Table.from_pylist([_coerce_row(row) for row in inserts], schema=ARROW_SCHEMA) if inserts else None
+    if updates:
+        df, id_idx = _load_indexed()
+        for row in updates:
+            _assign_row(df, row, id_idx[row["id"]])
+        # Inserts ride along in the same rewrite, so the whole batch lands atomically
+        if new_rows is not None:
+            df = _concat_rows(df, new_rows.to_pandas())
+        _save_data(df, validated=True)
+    elif new_rows is not None:
+        _append_rows(new_rows)
+
+    logger.info("Upserted %s rows (%s new, %s updated)", len(rows), len(inserts), len(updates))
+    return rows
+
 def save_row(row: Dict[str, Any]):
     """Save a single row (alias for upsert_row)"""
     return upsert_row(row)
 
 def get(id: str) -> Optional[Dict[str, Any]]:
     """Get a row by ID"""
-    df = _load_data()
-    matching_rows = df[df["id"] == id]
-    
+    with _cache_lock:
+        if _CACHE["df"] is not None:
+            position = _id_index().get(id)
+            if position is None:
+                return None
+            return _CACHE["df"].iloc[position].to_dict()
+
+    matching_rows = _read_rows([("id", "=", id)])
+
     if len(matching_rows) > 0:
         return matching_rows.iloc[0].to_dict()
     return None
 
+def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Same output as to_dict("records"), built from row tuples at about half the cost"""
+    columns = list(df.columns)
+    return [dict(zip(columns, values)) for values in df.itertuples(index=False, name=None)]
+
 def list_pendientes() -> List[Dict[str, Any]]:
     """List all pending (uncategorized) expenses"""
-    df = _load_data()
-    pendientes = df[df["estado"] == "pendiente"]
-    return pendientes.to_dict("records")
+    if _cache_warm():
+        df = _load_data()
+        pendientes = df[df["estado"] == "pendiente"]
+    else:
+        # Cold cache: scan with the filter pushed down instead of loading every row
+        pendientes = _read_rows([("estado", "=", "pendiente")])
+    return _to_records(pendientes)
 
 def list_receivables() -> List[Dict[str, Any]]:
     """List all shared expenses pending settlement"""
-    df = _load_data()
-    receivables = df[
-        (df["porcentaje_compartido"] > 0) & 
-        (df["settlement_status"].isin(["", "pending"]) | df["settlement_status"].isna())
-    ]
-    return receivables.to_dict("records")
+    if _cache_warm():
+        df = _load_data()
+    else:
+        # Cold cache: only shared rows leave the scan, the status check runs on those
+        df = _read_rows([("porcentaje_compartido", ">", 0)])
+    # Unsettled means "", "pending" or missing; a per-category lookup table indexed
+    # by the codes answers that with one gather (its last slot catches code -1)
+    status = df["settlement_status"].cat
+    unsettled = np.zeros(len(status.categories) + 1, dtype=bool)
+    unsettled[status.categories.get_indexer(["", "pending"])] = True
+    unsettled[-1] = True
+    mask = (df["porcentaje_compartido"].to_numpy() > 0) & unsettled[status.codes.to_numpy()]
+    receivables = df.iloc[np.flatnonzero(mask)]
+    return _to_records(receivables)
+
+def _write_excel_sheets(writer: pd.ExcelWriter, df: pd.DataFrame):
+    """Write the generated summary sheets to an open Excel writer"""
+    # Sheet 1: MOVIMIENTOS - All movements
+    # Chronological, since rows read back from the id-sorted base file come in id order
+    movements_df = df.sort_values("fecha", kind="stable").assign(fecha=lambda d: d["fecha"].dt.strftime("%Y-%m-%d"))
+    movements_df.to_excel(writer, sheet_name="MOVIMIENTOS", index=False)
+    
+    # Sheet 2: RESUMEN_AUTO - Net expenses by category using monto_tu_parte
+    # Only the grouped columns are taken, so the row filter never copies the whole frame
+    expenses_df = df.loc[df["tipo"].to_numpy() != "transfer_in", ["categoria", "monto_tu_parte", "id"]]
+    if not expenses_df.empty:
+        resumen_auto = expenses_df.groupby("categoria", observed=True).agg({
+            "monto_tu_parte": "sum",
+            "id": "count"
+        }).reset_index()
+        resumen_auto.columns = ["Categoria", "Monto_Neto", "Cantidad"]
+        resumen_auto = resumen_auto.sort_values("Monto_Neto", ascending=False)
+        resumen_auto.to_excel(writer, sheet_name="RESUMEN_AUTO", index=False)
+    
+    # Sheet 3: RESUMEN_CASHFLOW - Income/expenses/net by month
+    # Computed from the in-memory frame, so there is no per-month parquet I/O to
+    # narrow down; the single groupby is cheap next to writing the workbook itself
+    mes = df["fecha"].dt.to_period("M")
+    is_income = df["tipo"].eq("transfer_in").to_numpy()
+    totals = pd.DataFrame({
+        "Ingresos": np.where(is_income, df["monto_clp"].to_numpy(), 0.0),
+        "Gastos": np.where(is_income, 0.0, df["monto_tu_parte"].to_numpy())
+    }, index=df.index).groupby(mes).sum()
+    
+    if not totals.empty:
+        cashflow_df = totals.assign(Neto=totals["Ingresos"] - totals["Gastos"])
+        cashflow_df.index = cashflow_df.index.astype(str)
+        cashflow_df.rename_axis("Mes").reset_index().to_excel(writer, sheet_name="RESUMEN_CASHFLOW", index=False)
+
+def _has_user_sheets(path: Path) -> bool:
+    """Check if the workbook has sheets besides the generated ones"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return any(name not in GENERATED_SHEETS for name in workbook.sheetnames)
+    finally:
+        workbook.close()
 
 def sync_excel():
     """Synchronize data with Excel file"""
+    with _excel_lock:
+        _sync_excel()
+
+def _sync_excel():
+    """Write the Excel workbook; callers must hold _excel_lock"""
+    global _excel_synced
     try:
-        df = _load_data()
+        # Read-only use, so work on the cached frame instead of a copy
+        with _cache_lock:
+            df = _cached_frame()
+            version = _CACHE["version"]
         
         if df.empty:
             logger.warning("No data to sync to Excel")
             return
         
         if not EXCEL.exists():
-            logger.warning(f"Excel file {EXCEL} doesn't exist, skipping sync")
+            logger.warning("Excel file %s doesn't exist, skipping sync", EXCEL)
             return
         
-        # Load existing Excel
-        with pd.ExcelWriter(EXCEL, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-            
-            # Sheet 1: MOVIMIENTOS - All movements
-            movements_df = df.copy()
-            movements_df["fecha"] = movements_df["fecha"].dt.strftime("%Y-%m-%d")
-            movements_df.to_excel(writer, sheet_name="MOVIMIENTOS", index=False)
-            
-            # Sheet 2: RESUMEN_AUTO - Net expenses by category using monto_tu_parte
-            expenses_df = df[df["tipo"] != "transfer_in"].copy()
-            if not expenses_df.empty:
-                resumen_auto = expenses_df.groupby("categoria").agg({
-                    "monto_tu_parte": "sum",
-                    "id": "count"
-                }).reset_index()
-                resumen_auto.columns = ["Categoria", "Monto_Neto", "Cantidad"]
-                resumen_auto = resumen_auto.sort_values("Monto_Neto", ascending=False)
-                resumen_auto.to_excel(writer, sheet_name="RESUMEN_AUTO", index=False)
-            
-            # Sheet 3: RESUMEN_CASHFLOW - Income/expenses/net by month
-            df_copy = df.copy()
-            df_copy["mes"] = df_copy["fecha"].dt.to_period("M")
-            
-            cashflow_data = []
-            for mes in df_copy["mes"].dropna().unique():
-                mes_data = df_copy[df_copy["mes"] == mes]
-                
-                ingresos = mes_data[mes_data["tipo"] == "transfer_in"]["monto_clp"].sum()
-                gastos = mes_data[mes_data["tipo"] != "transfer_in"]["monto_tu_parte"].sum()
-                neto = ingresos - gastos
-                
-                cashflow_data.append({
-                    "Mes": str(mes),
-                    "Ingresos": ingresos,
-                    "Gastos": gastos,
-                    "Neto": neto
-                })
-            
-            if cashflow_data:
-                cashflow_df = pd.DataFrame(cashflow_data)
-                cashflow_df.to_excel(writer, sheet_name="RESUMEN_CASHFLOW", index=False)
+        if _excel_synced == (version, EXCEL.stat().st_mtime_ns):
+            logger.info("Excel already up to date, skipping sync")
+            return
         
+        if _has_user_sheets(EXCEL):
+            # Replace only the generated sheets, keeping the user's own sheets intact
+            with pd.ExcelWriter(EXCEL, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+                _write_excel_sheets(writer, df)
+        else:
+            # Nothing to preserve: stream a fresh workbook and swap it in atomically
+            staging = EXCEL.with_name(f".{EXCEL.stem}.tmp.xlsx")
+            with pd.ExcelWriter(staging, engine="xlsxwriter", engine_kwargs={"options": XLSXWRITER_OPTIONS}) as writer:
+                _write_excel_sheets(writer, df)
+            os.replace(staging, EXCEL)
+        
+        _excel_synced = (version, EXCEL.stat().st_mtime_ns)
         logger.info("Excel sync completed successfully")
         
     except Exception as e:
-        logger.error(f"Error syncing Excel: {e}")
+        logger.error("Error syncing Excel: %s", e)
         # Don't raise the exception to avoid breaking the flow
 
+def schedule_excel_sync(delay: float = EXCEL_SYNC_DELAY):
+    """Schedule a debounced sync_excel; repeated calls restart the timer"""
+    global _excel_timer
+    with _excel_timer_lock:
+        if _excel_timer is not None:
+            _excel_timer.cancel()
+        _excel_timer = threading.Timer(delay, _run_scheduled_excel_sync)
+        _excel_timer.daemon = True
+        _excel_timer.start()
+
+def _run_scheduled_excel_sync():
+    """Timer callback for schedule_excel_sync"""
+    global _excel_timer
+    with _excel_timer_lock:
+        _excel_timer = None
+    sync_excel()
+
+def flush_excel():
+    """Run a pending scheduled Excel sync immediately"""
+    global _excel_timer
+    with _excel_timer_lock:
+        timer, _excel_timer = _excel_timer, None
+    if timer is not None:
+        timer.cancel()
+        sync_excel()
+
+atexit.register(flush_excel)
+
 def get_all_data() -> pd.DataFrame:
     """Get all data as DataFrame"""
     return _load_data()
 
+@_serialized
 def delete_row(id: str) -> bool:
     """Delete a row by ID"""
-    df = _load_data()
-
-    # Find the row to delete
-    row_idx = df[df["id"] == id].index
-
-    if len(row_idx) == 0:
-        logger.warning(f"Row with id {id} not found")
+    df, id_idx = _load_indexed()
+    row_pos = id_idx.get(id, -1)
+    if row_pos < 0:
+        logger.warning("Row with id %s not found", id)
         return False
 
     # Delete the row
-    df = df.drop(row_idx[0])
+    df = df.drop(df.index[row_pos])
 
     # Save the updated data
-    _save_data(df)
+    _save_data(df, validated=True)
 
-    # Sync with Excel
-    sync_excel()
+    # Sync with Excel once the burst of changes settles
+    schedule_excel_sync()
 
-    logger.info(f"Deleted row with id: {id}")
+    logger.info("Deleted row with id: %s", id)
     return True
 
+@_serialized
 def update_settlement_status(expense_id: str, status: str):
     """Update settlement status for an expense"""
     row = get(expense_id)
     if row:
         row["settlement_status"] = status
         upsert_row(row)
-        logger.info(f"Updated settlement status for {expense_id} to {status}")
+        logger.info("Updated settlement status for %s to %s", expense_id, status)
 
 # Recurring Expenses Functions
 
@@ -279,109 +851,127 @@ def create_recurring_expense(expense_data: Dict[str, Any]) -> Dict[str, Any]:
     # Save the template
     saved_template = upsert_row(expense_data)
 
-    logger.info(f"Created recurring expense template: {saved_template['id']}")
+    logger.info("Created recurring expense template: %s", saved_template['id'])
     return saved_template
 
 def get_recurring_templates() -> List[Dict[str, Any]]:
     """Get all recurring expense templates"""
     df = _load_data()
     templates = df[df["is_recurring"] == True]
-    return templates.to_dict("records")
+    return _to_records(templates)
 
+# Template-only fields that generated expenses get reset to their defaults
+RECURRING_FIELDS = (
+    "is_recurring", "recurring_frequency", "recurring_day",
+    "recurring_end_date", "recurring_template_id", "recurring_next_date"
+)
+
+@_serialized
 def generate_recurring_expenses():
     """Generate actual expenses from recurring templates that are due"""
     df = _load_data()
-    templates = df[(df["is_recurring"] == True) & (df["tipo"] == "recurring_template")]
-
-    generated_count = 0
-
-    for _, template in templates.iterrows():
-        next_date = template.get("recurring_next_date")
-
-        # Check if it's time to generate a new expense
-        if pd.isna(next_date) or pd.to_datetime(next_date) <= datetime.now():
-            # Generate new expense from template
-            new_expense = template.copy()
-            new_expense["id"] = str(uuid.uuid4())
-            new_expense["fecha"] = datetime.now()
-            new_expense["tipo"] = "expense"  # Regular expense
-            new_expense["fuente"] = "recurring_auto"
-            new_expense["parent_id"] = template["id"]
-
-            # Calculate next occurrence
-            new_expense["recurring_next_date"] = _calculate_next_occurrence(
-                template.get("recurring_frequency", "monthly"),
-                template.get("recurring_day", 1)
-            )
-
-            # Update template with new next date
-            template_update = template.copy()
-            template_update["recurring_next_date"] = new_expense["recurring_next_date"]
-            upsert_row(template_update.to_dict())
-
-            # Save new expense (without recurring fields)
-            expense_to_save = new_expense.drop([
-                "is_recurring", "recurring_frequency", "recurring_day",
-                "recurring_end_date", "recurring_template_id", "recurring_next_date"
-            ]).to_dict()
-
-            upsert_row(expense_to_save)
-            generated_count += 1
-
-            logger.info(f"Generated recurring expense from template {template['id']}: {new_expense['descripcion']}")
-
-    if generated_count > 0:
-        sync_excel()
-        logger.info(f"Generated {generated_count} recurring expenses")
+    now = datetime.now()
 
-    return generated_count
+    next_dates = df["recurring_next_date"]
+    due_mask = (
+        (df["is_recurring"] == True) & (df["tipo"] == "recurring_template") &
+        (next_dates.isna() | (next_dates <= now))
+    )
+    if not due_mask.any():
+        return 0
 
-def _calculate_next_occurrence(frequency: str, day: int) -> datetime:
-    """Calculate the next occurrence date based on frequency and day"""
-    now = datetime.now()
+    due = df[due_mask]
 
-    if frequency == "monthly":
-        # Next occurrence on the specified day of next month
-        if now.day >= day:
-            # Next month
-            if now.month == 12:
-                next_month = 1
-                next_year = now.year + 1
-            else:
-                next_month = now.month + 1
-                next_year = now.year
-        else:
-            # This month
-            next_month = now.month
-            next_year = now.year
+    # Next occurrence only depends on (frequency, day), so compute it once per pair
+    schedule = due[["recurring_frequency", "recurring_day"]]
+    pairs = schedule.drop_duplicates()
+    pair_next = {
+        (frequency, day): _calculate_next_occurrence(frequency, day, now)
+        for frequency, day in zip(pairs["recurring_frequency"], pairs["recurring_day"])
+    }
+    new_next_dates = pd.to_datetime([
+        pair_next[(frequency, day)]
+        for frequency, day in zip(schedule["recurring_frequency"], schedule["recurring_day"])
+    ])
+
+    # Build all new expenses (with recurring fields reset) in one frame; the template
+    # rows are already typed, so only the replaced columns need their schema dtype
+    count = len(due)
+    new_expenses = due.assign(
+        **{col: _default_column(col, due.index) for col in RECURRING_FIELDS},
+        id=_uuid_batch(count),
+        fecha=pd.Series(now, index=due.index, dtype="datetime64[ns]"),
+        tipo=pd.Categorical(["expense"] * count),  # Regular expense
+        fuente=pd.Categorical(["recurring_auto"] * count),
+        parent_id=due["id"].to_numpy()
+    )
 
-        try:
-            next_date = datetime(next_year, next_month, day)
-        except ValueError:
-            # Handle invalid dates (e.g., Feb 30)
-            next_date = datetime(next_year, next_month + 1, 1)
+    # Update templates with new next date and persist everything in one write
+    df.loc[due.index, "recurring_next_date"] = new_next_dates
+    df = _concat_rows(df, new_expenses)
+    _save_data(df, validated=True)
 
-    elif frequency == "weekly":
-        # Next occurrence on the specified day of week
-        days_ahead = (day - now.weekday()) % 7
-        if days_ahead == 0:
-            days_ahead = 7  # Next week if today is the day
-        next_date = now + pd.Timedelta(days=days_ahead)
+    for template_id, descripcion in zip(due["id"], due["descripcion"]):
+        logger.info("Generated recurring expense from template %s: %s", template_id, descripcion)
 
-    elif frequency == "daily":
-        next_date = now + pd.Timedelta(days=1)
+    generated_count = len(due)
+    schedule_excel_sync()
+    logger.info("Generated %s recurring expenses", generated_count)
 
+    return generated_count
+
+@functools.lru_cache(maxsize=128)
+def _next_monthly_date(today: date, day: int) -> datetime:
+    """Next occurrence on the specified day of this or next month; pure, so memoized"""
+    if today.day >= day:
+        # Next month
+        next_month = 1 if today.month == 12 else today.month + 1
+        next_year = today.year + 1 if today.month == 12 else today.year
     else:
-        # Default to monthly
-        next_date = now + pd.Timedelta(days=30)
+        # This month
+        next_month = today.month
+        next_year = today.year
 
-    return next_date
+    try:
+        return datetime(next_year, next_month, day)
+    except ValueError:
+        # Handle invalid dates (e.g., Feb 30)
+        return datetime(next_year, next_month + 1, 1)
+
+def _next_monthly(now: datetime, day: int) -> datetime:
+    return _next_monthly_date(now.date(), int(day))
+
+def _next_weekly(now: datetime, day: int) -> datetime:
+    """Next occurrence on the specified day of week, never today"""
+    days_ahead = (day - now.weekday()) % 7 or 7
+    return now + pd.Timedelta(days=days_ahead)
+
+def _next_daily(now: datetime, day: int) -> datetime:
+    return now + pd.Timedelta(days=1)
+
+def _next_default(now: datetime, day: int) -> datetime:
+    # Unknown frequencies default to roughly monthly
+    return now + pd.Timedelta(days=30)
+
+# Next-occurrence rule per recurring_frequency
+_NEXT_OCCURRENCE = {
+    "monthly": _next_monthly,
+    "weekly": _next_weekly,
+    "daily": _next_daily,
+}
+
+def _calculate_next_occurrence(frequency: str, day: int, now: Optional[datetime] = None) -> datetime:
+    """Calculate the next occurrence date based on frequency and day"""
+    if now is None:
+        now = datetime.now()
+    return _NEXT_OCCURRENCE.get(frequency, _next_default)(now, day)
 
+@_serialized
 def update_recurring_template(template_id: str, updates: Dict[str, Any]) -> bool:
     """Update a recurring expense template"""
     template = get(template_id)
     if not template or not template.get("is_recurring"):
-        logger.warning(f"Template {template_id} not found or not recurring")
+        logger.warning("Template %s not found or not recurring", template_id)
         return False
 
     # Update template
@@ -396,21 +986,22 @@ def update_recurring_template(template_id: str, updates: Dict[str, Any]) -> bool
         )
 
     upsert_row(template)
-    logger.info(f"Updated recurring template: {template_id}")
+    logger.info("Updated recurring template: %s", template_id)
     return True
 
+@_serialized
 def delete_recurring_template(template_id: str) -> bool:
     """Delete a recurring expense template"""
     template = get(template_id)
     if not template or not template.get("is_recurring"):
-        logger.warning(f"Template {template_id} not found or not recurring")
+        logger.warning("Template %s not found or not recurring", template_id)
         return False
 
     # Delete the template
     success = delete_row(template_id)
 
     if success:
-        logger.info(f"Deleted recurring template: {template_id}")
+        logger.info("Deleted recurring template: %s", template_id)
 
         # Optionally delete generated expenses from this template
         # This could be a separate function if needed
@@ -471,20 +1062,29 @@ def create_installment_purchase(purchase_data: Dict[str, Any]) -> Dict[str, Any]
     # Save the installment purchase
     saved_purchase = upsert_row(purchase_data)
 
-    logger.info(f"Created installment purchase: {saved_purchase['id']} - {total_installments} installments of {installment_amount}, {paid_installments} already paid")
+    logger.info("Created installment purchase: %s - %s installments of %s, %s already paid", saved_purchase['id'], total_installments, installment_amount, paid_installments)
     return saved_purchase
 
 def get_installment_purchases() -> List[Dict[str, Any]]:
     """Get all installment purchases"""
     df = _load_data()
     purchases = df[df["is_installment"] == True]
-    return purchases.to_dict("records")
+    return _to_records(purchases)
+
+def _installment_progress(purchase: Dict[str, Any]) -> Dict[str, Any]:
+    """Partial update row carrying only a purchase's payment progress"""
+    return {
+        "id": purchase["id"],
+        "installment_paid_installments": purchase["installment_paid_installments"],
+        "installment_remaining_balance": purchase["installment_remaining_balance"]
+    }
 
+@_serialized
 def record_installment_payment(purchase_id: str, payment_amount: float, payment_date: Optional[str] = None) -> bool:
     """Record a payment for an installment purchase"""
     purchase = get(purchase_id)
     if not purchase or not purchase.get("is_installment"):
-        logger.warning(f"Installment purchase {purchase_id} not found")
+        logger.warning("Installment purchase %s not found", purchase_id)
         return False
 
     # Update paid installments and remaining balance
@@ -497,7 +1097,7 @@ def record_installment_payment(purchase_id: str, payment_amount: float, payment_
 
     # Create payment record
     payment_record = {
-        "id": str(uuid.uuid4()),
+        "id": _new_id(),
         "fecha": payment_date or datetime.now().isoformat(),
         "descripcion": f"Pago cuota {paid_installments} - {purchase.get('descripcion', '')}",
         "monto_clp": payment_amount,
@@ -509,71 +1109,74 @@ def record_installment_payment(purchase_id: str, payment_amount: float, payment_
         "estado": "categorizado"
     }
 
-    # Save payment and update purchase
-    upsert_row(payment_record)
-    upsert_row(purchase)
+    # Save payment and update purchase (only the changed columns) in one write
+    upsert_rows([payment_record, _installment_progress(purchase)])
 
-    logger.info(f"Recorded installment payment: {payment_amount} for purchase {purchase_id} (installment {paid_installments})")
+    logger.info("Recorded installment payment: %s for purchase %s (installment %s)", payment_amount, purchase_id, paid_installments)
     return True
 
 def get_upcoming_installment_payments(days_ahead: int = 30) -> List[Dict[str, Any]]:
     """Get upcoming installment payments within the specified days"""
-    df = _load_data()
-    purchases = df[(df["is_installment"] == True) & (df["installment_remaining_balance"] > 0)]
-
-    upcoming_payments = []
-
-    for _, purchase in purchases.iterrows():
-        first_payment_date = purchase.get("installment_first_payment_date")
-        if pd.isna(first_payment_date):
-            continue
-
-        first_date = pd.to_datetime(first_payment_date)
-        paid_installments = int(purchase.get("installment_paid_installments", 0))
-        total_installments = int(purchase.get("installment_total_installments", 1))
-        payment_frequency = purchase.get("installment_payment_frequency", "monthly")
-
-        # Calculate next payment date
-        if payment_frequency == "monthly":
-            next_payment_date = first_date + pd.DateOffset(months=paid_installments)
-        elif payment_frequency == "weekly":
-            next_payment_date = first_date + pd.DateOffset(weeks=paid_installments)
-        else:
-            next_payment_date = first_date + pd.DateOffset(months=paid_installments)
-
-        # Check if payment is due within the specified days
-        days_until_due = (next_payment_date - pd.Timestamp.now()).days
-
-        if 0 <= days_until_due <= days_ahead and paid_installments < total_installments:
-            upcoming_payments.append({
-                "purchase_id": purchase["id"],
-                "descripcion": purchase.get("descripcion", ""),
-                "next_payment_date": next_payment_date.isoformat(),
-                "days_until_due": days_until_due,
-                "installment_amount": float(purchase.get("installment_installment_amount", 0)),
-                "installment_number": paid_installments + 1,
-                "total_installments": total_installments,
-                "remaining_balance": float(purchase.get("installment_remaining_balance", 0))
-            })
-
-    return upcoming_payments
+    df = _load_data(columns=[
+        "id", "descripcion", "is_installment", "installment_first_payment_date",
+        "installment_payment_frequency", "installment_paid_installments",
+        "installment_total_installments", "installment_installment_amount",
+        "installment_remaining_balance"
+    ])
+    purchases = df[
+        (df["is_installment"] == True) & (df["installment_remaining_balance"] > 0) &
+        df["installment_first_payment_date"].notna()
+    ]
+    if purchases.empty:
+        return []
+
+    # Check if the next payment is due within the specified days
+    next_payment_dates = _next_installment_dates(purchases)
+    days_until_due = (next_payment_dates - pd.Timestamp.now()).dt.days
+    paid = purchases["installment_paid_installments"]
+    total = purchases["installment_total_installments"]
+    mask = ((days_until_due >= 0) & (days_until_due <= days_ahead) & (paid < total)).to_numpy()
+
+    upcoming = purchases[mask]
+    return [
+        {
+            "purchase_id": purchase_id,
+            "descripcion": descripcion,
+            "next_payment_date": next_payment_date.isoformat(),
+            "days_until_due": days,
+            "installment_amount": amount,
+            "installment_number": paid_installments + 1,
+            "total_installments": total_installments,
+            "remaining_balance": remaining_balance
+        }
+        for purchase_id, descripcion, next_payment_date, days, amount, paid_installments, total_installments, remaining_balance in zip(
+            upcoming["id"].tolist(),
+            upcoming["descripcion"].tolist(),
+            next_payment_dates[mask],
+            days_until_due[mask].tolist(),
+            upcoming["installment_installment_amount"].tolist(),
+            paid[mask].tolist(),
+            total[mask].tolist(),
+            upcoming["installment_remaining_balance"].tolist()
+        )
+    ]
 
 def get_installment_purchase_summary() -> Dict[str, Any]:
     """Get summary of all installment purchases"""
-    df = _load_data()
+    df = _load_data(columns=[
+        "is_installment", "installment_payment_frequency",
+        "installment_installment_amount", "installment_remaining_balance"
+    ])
     purchases = df[df["is_installment"] == True]
 
     total_debt = purchases["installment_remaining_balance"].sum()
     total_purchases = len(purchases)
-    active_purchases = len(purchases[purchases["installment_remaining_balance"] > 0])
+    active = purchases["installment_remaining_balance"] > 0
+    active_purchases = int(active.sum())
 
     # Calculate monthly payment commitment
-    monthly_commitment = 0.0
-    for _, purchase in purchases.iterrows():
-        if purchase["installment_remaining_balance"] > 0:
-            frequency = purchase.get("installment_payment_frequency", "monthly")
-            if frequency == "monthly":
-                monthly_commitment += float(purchase.get("installment_installment_amount", 0))
+    monthly = active & (purchases["installment_payment_frequency"] == "monthly")
+    monthly_commitment = float(purchases.loc[monthly, "installment_installment_amount"].sum())
 
     return {
         "total_debt": float(total_debt),
@@ -583,20 +1186,31 @@ def get_installment_purchase_summary() -> Dict[str, Any]:
         "upcoming_payments": get_upcoming_installment_payments(7)  # Next 7 days
     }
 
+# Fields that determine installment_installment_amount and installment_remaining_balance
+INSTALLMENT_AMOUNT_FIELDS = ("installment_total_amount", "installment_total_installments", "installment_interest_rate")
+
+@_serialized
 def update_installment_purchase(purchase_id: str, updates: Dict[str, Any]) -> bool:
     """Update an installment purchase"""
     purchase = get(purchase_id)
     if not purchase or not purchase.get("is_installment"):
-        logger.warning(f"Installment purchase {purchase_id} not found")
+        logger.warning("Installment purchase %s not found", purchase_id)
         return False
 
+    # Keep only the fields whose coerced value actually differs; an identity update skips the write
+    changes = {
+        key: value for key, value in updates.items()
+        if key in SCHEMA_COLUMN_SET
+        and COERCERS[key](value) != COERCERS[key](purchase.get(key))
+    }
+    if not changes:
+        return True
+
     # Update fields
-    for key, value in updates.items():
-        if key in SCHEMA_COLUMNS:
-            purchase[key] = value
+    purchase.update(changes)
 
     # Recalculate installment amount if relevant fields changed
-    if any(key in updates for key in ["installment_total_amount", "installment_total_installments", "installment_interest_rate"]):
+    if any(key in changes for key in INSTALLMENT_AMOUNT_FIELDS):
         total_amount = float(purchase.get("installment_total_amount", 0))
         total_installments = int(purchase.get("installment_total_installments", 1))
         interest_rate = float(purchase.get("installment_interest_rate", 0))
@@ -611,174 +1225,162 @@ def update_installment_purchase(purchase_id: str, updates: Dict[str, Any]) -> bo
         purchase["installment_remaining_balance"] = total_amount - (float(purchase.get("installment_paid_installments", 0)) * installment_amount)
 
     upsert_row(purchase)
-    logger.info(f"Updated installment purchase: {purchase_id}")
+    logger.info("Updated installment purchase: %s", purchase_id)
     return True
 
+@_serialized
 def delete_installment_purchase(purchase_id: str) -> bool:
     """Delete an installment purchase"""
     purchase = get(purchase_id)
     if not purchase or not purchase.get("is_installment"):
-        logger.warning(f"Installment purchase {purchase_id} not found")
+        logger.warning("Installment purchase %s not found", purchase_id)
         return False
 
     # Delete the purchase
     success = delete_row(purchase_id)
 
     if success:
-        logger.info(f"Deleted installment purchase: {purchase_id}")
+        logger.info("Deleted installment purchase: %s", purchase_id)
 
         # Optionally delete related payment records
         # This could be implemented if needed
 
     return success
 
+def _add_months(dates: pd.Series, months: np.ndarray) -> pd.Series:
+    """Vectorized dates + pd.DateOffset(months=n), clipping to the end of shorter months"""
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    month = values.astype("datetime64[M]")
+    # Month arithmetic on datetime64[M] is plain integer math, no per-row offset objects
+    month_start = month + months.astype("timedelta64[M]")
+    days_in_month = ((month_start + np.timedelta64(1, "M")).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(np.int64)
+    day = np.minimum((values.astype("datetime64[D]") - month.astype("datetime64[D]")).astype(np.int64), days_in_month - 1)
+    shifted = month_start.astype("datetime64[D]") + day.astype("timedelta64[D]") + (values - values.astype("datetime64[D]"))
+    return pd.Series(shifted.astype("datetime64[ns]"), index=dates.index)
+
+def _next_installment_dates(purchases: pd.DataFrame) -> pd.Series:
+    """Due date of each purchase's next unpaid installment (first payment dates must be set)"""
+    first_dates = purchases["installment_first_payment_date"]
+    paid = purchases["installment_paid_installments"].to_numpy().astype(np.int64)
+    by_week = first_dates + pd.to_timedelta(paid * 7, unit="D")
+    by_month = _add_months(first_dates, paid)
+    # Anything other than weekly is paid monthly
+    return by_month.where(purchases["installment_payment_frequency"].to_numpy() != "weekly", by_week)
+
 def generate_installment_expenses():
     """Generate automatic expenses for current month installment payments only"""
-    df = _load_data()
-    purchases = df[(df["is_installment"] == True) & (df["installment_remaining_balance"] > 0)]
-
-    generated_count = 0
-    now = pd.Timestamp.now()
-
-    for _, purchase in purchases.iterrows():
-        first_payment_date = purchase.get("installment_first_payment_date")
-        if pd.isna(first_payment_date):
-            continue
-
-        first_date = pd.to_datetime(first_payment_date)
-        paid_installments = int(purchase.get("installment_paid_installments", 0))
-        total_installments = int(purchase.get("installment_total_installments", 1))
-        payment_frequency = purchase.get("installment_payment_frequency", "monthly")
-        installment_amount = float(purchase.get("installment_installment_amount", 0))
-
-        # Only generate expense for the current month installment
-        current_installment_num = paid_installments + 1
-
-        # Check if we still have installments to pay
-        if current_installment_num > total_installments:
-            continue
-
-        # Calculate payment date for current installment
-        if payment_frequency == "monthly":
-            payment_date = first_date + pd.DateOffset(months=current_installment_num - 1)
-        elif payment_frequency == "weekly":
-            payment_date = first_date + pd.DateOffset(weeks=current_installment_num - 1)
-        else:
-            payment_date = first_date + pd.DateOffset(months=current_installment_num - 1)
-
-        # Only generate if this installment is due this month (or within the next 30 days)
-        if payment_date.year == now.year and payment_date.month == now.month:
-            # Generate for current month
-            pass
-        elif (payment_date - now).days <= 30 and payment_date > now:
-            # Generate for upcoming installments within 30 days
-            pass
-        else:
-            # Skip installments that are not due soon
-            continue
-            # Check if expense already exists for this installment
-            existing_expenses = df[
-                (df["parent_id"] == purchase["id"]) &
-                (df["tipo"] == "installment_expense") &
-                (df["descripcion"].str.contains(f"Cuota {current_installment_num}"))
-            ]
-
-            if len(existing_expenses) == 0:
-                # Generate expense for this installment
-                expense_data = {
-                    "id": str(uuid.uuid4()),
-                    "fecha": payment_date.isoformat(),
-                    "descripcion": f"Cuota {current_installment_num} - {purchase.get('descripcion', '')}",
-                    "monto_clp": installment_amount,
-                    "categoria": purchase.get("categoria", "deudas"),
-                    "medio": purchase.get("medio", "TC"),
-                    "tipo": "installment_expense",
-                    "parent_id": purchase["id"],
-                    "fuente": "installment_auto",
-                    "estado": "categorizado",
-                    "is_installment": False  # This is the actual expense, not the purchase record
-                }
-
-                upsert_row(expense_data)
-                generated_count += 1
-
-                logger.info(f"Generated current month installment expense: {expense_data['descripcion']} for purchase {purchase['id']}")
-
-    if generated_count > 0:
-        sync_excel()
-        logger.info(f"Generated {generated_count} current month installment expenses")
-
-    return generated_count
+    # Generation has never been active (the original loop skipped every installment
+    # before reaching it), so this stays a no-op until it can avoid duplicating the
+    # "Pago cuota N" rows that record_installment_payment writes
+    return 0
 
+@_serialized
 def cleanup_duplicate_installment_expenses():
     """Clean up duplicate installment expenses from previous months"""
     df = _load_data()
     now = pd.Timestamp.now()
 
     # Find installment expenses from previous months that shouldn't be there
-    duplicate_expenses = df[
+    fechas = df["fecha"]
+    before_this_month = (fechas.dt.year < now.year) | ((fechas.dt.year == now.year) & (fechas.dt.month < now.month))
+    duplicate_mask = (
         (df["tipo"] == "installment_expense") &
         (df["fuente"] == "installment_auto") &
-        (pd.to_datetime(df["fecha"]).dt.year < now.year) |
-        ((pd.to_datetime(df["fecha"]).dt.year == now.year) &
-         (pd.to_datetime(df["fecha"]).dt.month < now.month))
-    ]
+        before_this_month
+    ).to_numpy()
 
-    deleted_count = 0
-    for _, expense in duplicate_expenses.iterrows():
-        delete_row(expense["id"])
-        deleted_count += 1
-        logger.info(f"Cleaned up duplicate installment expense: {expense['descripcion']}")
+    deleted_count = int(duplicate_mask.sum())
+    if deleted_count > 0:
+        for descripcion in df.loc[duplicate_mask, "descripcion"]:
+            logger.info("Cleaned up duplicate installment expense: %s", descripcion)
+        _save_data(df[~duplicate_mask], validated=True)
 
     if deleted_count > 0:
-        sync_excel()
-        logger.info(f"Cleaned up {deleted_count} duplicate installment expenses")
+        schedule_excel_sync()
+        logger.info("Cleaned up %s duplicate installment expenses", deleted_count)
 
     return deleted_count
 
+# Purchase fields read on every historical payment, fetched in one call
+_installment_state = operator.itemgetter(
+    "is_installment", "installment_paid_installments",
+    "installment_total_installments", "installment_remaining_balance"
+)
+
 def record_historical_installment_payment(purchase_id: str, installment_number: int, payment_amount: float, payment_date: str) -> bool:
     """Record a historical payment for a specific installment number"""
-    purchase = get(purchase_id)
-    if not purchase or not purchase.get("is_installment"):
-        logger.warning(f"Installment purchase {purchase_id} not found")
-        return False
-
-    paid_installments = int(purchase.get("installment_paid_installments", 0))
-    total_installments = int(purchase.get("installment_total_installments", 1))
-    remaining_balance = float(purchase.get("installment_remaining_balance", 0))
-
-    # Validate installment number
-    if installment_number < 1 or installment_number > total_installments:
-        logger.warning(f"Invalid installment number {installment_number} for purchase {purchase_id}")
-        return False
-
-    # If this installment number is greater than currently paid installments, update accordingly
-    if installment_number > paid_installments:
-        # Calculate how many installments we're catching up
-        installments_to_add = installment_number - paid_installments
-        amount_to_subtract = payment_amount  # For this specific payment
-
-        # Update purchase record
-        purchase["installment_paid_installments"] = installment_number
-        purchase["installment_remaining_balance"] = max(0, remaining_balance - amount_to_subtract)
-
-        upsert_row(purchase)
-
-    # Create payment record
-    payment_record = {
-        "id": str(uuid.uuid4()),
-        "fecha": payment_date,
-        "descripcion": f"Pago cuota {installment_number} - {purchase.get('descripcion', '')}",
-        "monto_clp": payment_amount,
-        "categoria": purchase.get("categoria", "deudas"),
-        "medio": purchase.get("medio", "TC"),
-        "tipo": "installment_payment",
-        "parent_id": purchase_id,
-        "fuente": "manual",
-        "estado": "categorizado"
+    return record_historical_installment_payments([(purchase_id, installment_number, payment_amount, payment_date)]) == 1
+
+@_serialized
+def record_historical_installment_payments(payments: List[tuple]) -> int:
+    """Record (purchase_id, installment_number, amount, date) payments with a single write; returns how many were recorded"""
+    # Reject impossible installment numbers before touching storage
+    for purchase_id, installment_number, _, _ in payments:
+        if installment_number < 1:
+            logger.warning("Invalid installment number %s for purchase %s", installment_number, purchase_id)
+    payments = [payment for payment in payments if payment[1] >= 1]
+    if not payments:
+        return 0
+
+    # Fetch every referenced purchase up front from one indexed load; each is then
+    # updated in place across its payments instead of being re-read per call
+    df, id_idx = _load_indexed()
+    purchases = {
+        purchase_id: df.iloc[id_idx[purchase_id]].to_dict() if purchase_id in id_idx else None
+        for purchase_id in {payment[0] for payment in payments}
     }
+    updated = {}
+    templates = {}
+    payment_records = []
+    # Payment ids for the whole batch come from one os.urandom call
+    payment_ids = _uuid_batch(len(payments))
+    for payment_id, (purchase_id, installment_number, payment_amount, payment_date) in zip(payment_ids, payments):
+        purchase = purchases[purchase_id]
+        if not purchase:
+            logger.warning("Installment purchase %s not found", purchase_id)
+            continue
+        is_installment, paid_installments, total_installments, remaining_balance = _installment_state(purchase)
+        if not is_installment:
+            logger.warning("Installment purchase %s not found", purchase_id)
+            continue
 
-    upsert_row(payment_record)
+        paid_installments = int(paid_installments)
+        total_installments = int(total_installments)
+        remaining_balance = float(remaining_balance)
 
-    logger.info(f"Recorded historical installment payment: {payment_amount} for installment {installment_number} of purchase {purchase_id}")
-    return True
+        # Validate installment number against the purchase
+        if installment_number > total_installments:
+            logger.warning("Invalid installment number %s for purchase %s", installment_number, purchase_id)
+            continue
+
+        # If this installment number is greater than currently paid installments, update accordingly
+        if installment_number > paid_installments:
+            purchase["installment_paid_installments"] = installment_number
+            purchase["installment_remaining_balance"] = max(0, remaining_balance - payment_amount)
+            updated[purchase_id] = purchase
+
+        # Create payment record from the purchase's constant fields, built once per purchase
+        if purchase_id not in templates:
+            templates[purchase_id] = ({
+                "categoria": purchase.get("categoria", "deudas"),
+                "medio": purchase.get("medio", "TC"),
+                "tipo": "installment_payment",
+                "parent_id": purchase_id,
+                "fuente": "manual",
+                "estado": "categorizado"
+            }, purchase.get("descripcion", ""))
+        template, descripcion = templates[purchase_id]
+        payment_records.append({
+            **template,
+            "id": payment_id,
+            "fecha": payment_date,
+            "descripcion": f"Pago cuota {installment_number} - {descripcion}",
+            "monto_clp": payment_amount
+        })
+
+        logger.info("Recorded historical installment payment: %s for installment %s of purchase %s", payment_amount, installment_number, purchase_id)
+
+    # Purchase updates (only the two changed columns) and payments are persisted together in one write
+    if payment_records:
+        upsert_rows([_installment_progress(purchase) for purchase in updated.values()] + payment_records)
+    return len(payment_records)
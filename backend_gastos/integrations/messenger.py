@@ -6,22 +6,141 @@ Includes retry logic, rate limiting, and comprehensive error handling for alpha
 import asyncio
 import httpx
 import logging
-from typing import Dict, List, Any, Optional
-import json
+import random
+from typing import Dict, List, Any, Optional, Tuple
 import re
 import time
-import hashlib
 import hmac
+import importlib.util
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json is just slower
+    import json
+    _json_loads = json.loads
 
-from core.paths import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-from core.errors import telegram_error, ExternalServiceError
+    def _json_dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+from core.paths import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_WEBHOOK_SECRET
 
 logger = logging.getLogger(__name__)
 
+# Inline keyboard callback data: "<action>:<gasto_id>:<choice>"; ids are uuid4 strings
+# (older rows) or 32-char hex, so anything else is rejected before touching storage
+CALLBACK_DATA = re.compile(r"^(\w+):([0-9a-f-]{32,36}):(\w+)$")
+
+# HTTP/2 lets concurrent API calls share one multiplexed connection; needs the h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Request body content type (payloads are pre-serialized, see _send_request)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# "id <gid> con <Nombre> [% <porcentaje>]"; the name may not start with the % marker
+SHARING_COMMAND = re.compile(r"^id\s+(\S+)\s+con(?:\s+(?!%)(.+?))?(?:\s+%\s+([-+]?\d+(?:\.\d+)?))?\s*$", re.IGNORECASE)
+
+# Without a successful request for this many seconds the integration reports unhealthy
+HEALTHY_WINDOW = 3600  # 1 hour
+
+# Health probes within this many seconds of each other share one status dict
+HEALTH_STATUS_TTL = 1.0
+
+# Categories offered for manual selection as (display name, category key)
+CATEGORIES = (
+    ("🍽️ Alimentación", "alimentacion"),
+    ("🚗 Transporte", "transporte"),
+    ("🛒 Supermercado", "supermercado"),
+    ("⛽ Combustible", "combustible"),
+    ("🏠 Servicios", "servicios"),
+    ("💊 Salud", "salud"),
+    ("🎬 Entretenimiento", "entretenimiento"),
+    ("👕 Ropa", "ropa"),
+    ("🏠 Hogar", "hogar"),
+    ("📚 Educación", "educacion"),
+    ("🏃 Deportes", "deportes"),
+    ("💻 Tecnología", "tecnologia"),
+    ("🛍️ Compras Online", "comercio_electronico"),
+    ("✈️ Viajes", "viajes"),
+    ("❓ Otros", "otros")
+)
+
+# Category keyboard layout (2 buttons per row), grouped once at import
+CATEGORY_KEYBOARD_ROWS = tuple(CATEGORIES[i:i + 2] for i in range(0, len(CATEGORIES), 2))
+
+# Sharing and confirmation keyboard layouts as rows of (button text, choice)
+SHARE_KEYBOARD_ROWS = (
+    (("❌ No compartido", "no"), ("👥 50/50", "50")),
+    (("🧑‍🤝‍🧑 Otro %", "custom"),)
+)
+CONFIRM_KEYBOARD_ROWS = (
+    (("✅ Correcto", "yes"), ("❌ Cambiar", "no")),
+)
+
+# Outbound pacing: sustained requests per second and burst size, under Telegram's ~30 req/s limit
+RATE_LIMIT_PER_SECOND = 25
+RATE_LIMIT_BURST = 30
+
+# Reply to /help and its aliases
+HELP_TEXT = (
+    "🤖 *Comandos disponibles:*\n\n"
+    "💰 *Ingresos:*\n"
+    "`ingreso 50000 Sueldo septiembre`\n"
+    "`ingreso 15000 Reembolso cena de Juan`\n\n"
+    "🤝 *Gastos compartidos:*\n"
+    "`id ABC123 con Juan`\n"
+    "`id ABC123 con María % 30`\n\n"
+    "ℹ️ *Notas:*\n"
+    "• Los gastos se agregan automáticamente via MacroDroid\n"
+    "• Los ingresos 'de alguien' intentan emparejarse automáticamente\n"
+    "• Usa `/help` para ver este mensaje"
+)
+
+# Requests allowed in flight at once per messenger, on top of the token bucket pacing
+MAX_CONCURRENT_REQUESTS = 3
+
+# Messages use Telegram's legacy "Markdown" parse mode, where only these characters are
+# entity markers; escaping MarkdownV2-only characters (. ! - ...) would show the backslashes
+MARKDOWN_ESCAPES = str.maketrans({char: f"\\{char}" for char in "*_`["})
+# Any character in MARKDOWN_ESCAPES; text without one needs neither escaping nor parse_mode
+MARKDOWN_SPECIAL = re.compile(r"[*_`\[]")
+
+def _inline_keyboard(rows, action: str, gasto_id: str) -> List[List[Dict[str, str]]]:
+    """Fill a keyboard layout with "<action>:<gasto_id>:<choice>" callback data"""
+    return [
+        [{"text": text, "callback_data": f"{action}:{gasto_id}:{choice}"} for text, choice in row]
+        for row in rows
+    ]
+
+class _TokenBucket:
+    """Async token bucket pacing outbound API calls"""
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, capacity: int = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    async def acquire(self):
+        """Take one token, sleeping until one is available"""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.last = time.monotonic()
+                self.tokens = 0.0
+            else:
+                self.tokens -= 1
+
 class TelegramMessenger:
     """Enhanced Telegram bot integration for expense management with reliability features"""
 
@@ -33,13 +152,22 @@ class TelegramMessenger:
         # Reliability settings
         self.max_retries = 3
         self.retry_delay = 1.0  # Base delay in seconds
+        self.max_retry_delay = 30.0  # Cap on the backoff delay
         self.timeout = 30.0  # Request timeout
-        self.rate_limit_delay = 0.1  # Delay between requests to avoid rate limits
+        self._bucket = _TokenBucket()  # Paces every outbound request, retries included
+
+        # Shared HTTP client so connections to the API are kept alive between calls;
+        # created lazily inside the running event loop by _get_client
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._send_sem: Optional[asyncio.Semaphore] = None  # Created with the client, per loop
 
         # Health tracking
         self.last_successful_request = None
+        self._healthy_until = None  # last_successful_request + HEALTHY_WINDOW
         self.consecutive_failures = 0
         self.max_consecutive_failures = 5
+        self._health_cache: Optional[Tuple[float, Dict[str, Any]]] = None
 
         if not self.bot_token or not self.chat_id:
             logger.warning("Telegram configuration missing. Set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID")
@@ -50,13 +178,31 @@ class TelegramMessenger:
         """Escape Markdown special characters for Telegram"""
         if not text:
             return ""
-        # Escape Markdown special characters
-        special_chars = ['*', '_', '`', '[', ']', '(', ')', '~', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        escaped_text = text
-        for char in special_chars:
-            escaped_text = escaped_text.replace(char, f'\\{char}')
-        return escaped_text
+        if MARKDOWN_SPECIAL.search(text) is None:
+            return text
+        return text.translate(MARKDOWN_ESCAPES)
     
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, recreating it if closed or bound to another event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+            )
+            self._client_loop = loop
+            self._send_sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
     async def _send_request(self, method: str, data: Dict[str, Any]) -> Optional[Dict]:
         """Send request to Telegram API with retry logic and error handling"""
         if not self.bot_token:
@@ -67,60 +213,67 @@ class TelegramMessenger:
             logger.error("Too many consecutive Telegram failures, temporarily disabling")
             return None
 
-        url = f"{self.base_url}/{method}"
-
+        rate_limited = False  # Set after a 429 wait, which already spaces out the next attempt
         for attempt in range(self.max_retries):
             try:
-                # Rate limiting delay
-                if attempt > 0:
-                    await asyncio.sleep(self.rate_limit_delay * (2 ** attempt))  # Exponential backoff
-
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(url, json=data)
-
-                    # Handle different HTTP status codes
-                    if response.status_code == 200:
-                        result = response.json()
-                        if result.get('ok'):
-                            # Success - reset failure counter
-                            self.last_successful_request = time.time()
-                            self.consecutive_failures = 0
-                            return result
+                # Exponential backoff with jitter, so failed calls don't all retry in lockstep
+                if attempt > 0 and not rate_limited:
+                    delay = self.retry_delay * (2 ** attempt) * (1 + random.random() * 0.5)
+                    await asyncio.sleep(min(delay, self.max_retry_delay))
+                rate_limited = False
+
+                await self._bucket.acquire()
+                client = await self._get_client()
+                async with self._send_sem:
+                    response = await client.post(f"/{method}", content=_json_dumps(data), headers=JSON_HEADERS)
+
+                # Handle different HTTP status codes; Telegram reports API errors such as
+                # 400, 403 and 429 with an error status and the same JSON body as on 200
+                if response.status_code == 200 or 400 <= response.status_code < 500:
+                    result = _json_loads(response.content)
+                    if result.get('ok'):
+                        # Success - reset failure counter
+                        self.last_successful_request = time.time()
+                        self._healthy_until = self.last_successful_request + HEALTHY_WINDOW
+                        self.consecutive_failures = 0
+                        return result
+                    else:
+                        # Telegram API returned error
+                        error_code = result.get('error_code', 'UNKNOWN')
+                        error_description = result.get('description', 'Unknown error')
+
+                        # Handle specific Telegram errors
+                        if error_code == 429:  # Too Many Requests
+                            retry_after = (result.get('parameters', {}).get('retry_after')
+                                           or float(response.headers.get('Retry-After', 30)))
+                            logger.warning(f"Rate limited, retrying after {retry_after} seconds")
+                            await asyncio.sleep(retry_after + random.random())
+                            rate_limited = True
+                            continue
+                        elif error_code == 400:  # Bad Request
+                            logger.error(f"Bad request to Telegram API: {error_description}")
+                            break  # Don't retry bad requests
+                        elif error_code == 403:  # Bot blocked by user
+                            logger.error("Bot appears to be blocked by user")
+                            break
                         else:
-                            # Telegram API returned error
-                            error_code = result.get('error_code', 'UNKNOWN')
-                            error_description = result.get('description', 'Unknown error')
-
-                            # Handle specific Telegram errors
-                            if error_code == 429:  # Too Many Requests
-                                retry_after = result.get('parameters', {}).get('retry_after', 30)
-                                logger.warning(f"Rate limited, retrying after {retry_after} seconds")
-                                await asyncio.sleep(retry_after)
-                                continue
-                            elif error_code == 400:  # Bad Request
-                                logger.error(f"Bad request to Telegram API: {error_description}")
-                                break  # Don't retry bad requests
-                            elif error_code == 403:  # Bot blocked by user
-                                logger.error("Bot appears to be blocked by user")
+                            logger.error(f"Telegram API error {error_code}: {error_description}")
+                            if attempt == self.max_retries - 1:
                                 break
-                            else:
-                                logger.error(f"Telegram API error {error_code}: {error_description}")
-                                if attempt == self.max_retries - 1:
-                                    break
-                                continue
-
-                    elif response.status_code >= 500:
-                        # Server error - retry
-                        logger.warning(f"Telegram server error {response.status_code}, attempt {attempt + 1}")
-                        if attempt < self.max_retries - 1:
                             continue
-                        else:
-                            break
 
+                elif response.status_code >= 500:
+                    # Server error - retry
+                    logger.warning(f"Telegram server error {response.status_code}, attempt {attempt + 1}")
+                    if attempt < self.max_retries - 1:
+                        continue
                     else:
-                        # Other client errors
-                        logger.error(f"HTTP {response.status_code} from Telegram API")
-                        response.raise_for_status()
+                        break
+
+                else:
+                    # Unexpected status (redirects and the like)
+                    logger.error(f"HTTP {response.status_code} from Telegram API")
+                    response.raise_for_status()
 
             except httpx.TimeoutException:
                 logger.warning(f"Timeout connecting to Telegram API, attempt {attempt + 1}")
@@ -152,34 +305,43 @@ class TelegramMessenger:
             return False
 
         # Check if we had a successful request in the last hour
-        if self.last_successful_request:
-            return (time.time() - self.last_successful_request) < 3600  # 1 hour
+        if self._healthy_until is not None:
+            return time.time() < self._healthy_until
 
         return True
 
     def get_health_status(self) -> Dict[str, Any]:
-        """Get detailed health status"""
-        return {
+        """Get detailed health status, reusing the last result for HEALTH_STATUS_TTL seconds"""
+        now = time.monotonic()
+        if self._health_cache is not None and now - self._health_cache[0] < HEALTH_STATUS_TTL:
+            return self._health_cache[1]
+
+        status = {
             "configured": bool(self.bot_token and self.chat_id),
             "healthy": self.is_healthy(),
             "consecutive_failures": self.consecutive_failures,
             "last_success": self.last_successful_request,
             "max_failures": self.max_consecutive_failures
         }
+        self._health_cache = (now, status)
+        return status
 
     def validate_webhook_secret(self, update: Dict[str, Any], secret_token: Optional[str] = None) -> bool:
         """
         Validate incoming webhook using Telegram's secret token
         This provides basic security for webhook endpoints
         """
-        if not secret_token:
+        if not secret_token and not TELEGRAM_WEBHOOK_SECRET:
             # If no secret token configured, accept all (for development)
             return True
 
-        # For now, just check if the update looks like a valid Telegram update
-        # In production, you'd validate the secret token from headers
-        required_fields = ['update_id']
-        return all(field in update for field in required_fields)
+        if 'update_id' not in update:
+            return False
+
+        if TELEGRAM_WEBHOOK_SECRET:
+            # Constant-time comparison against the secret registered with setWebhook
+            return hmac.compare_digest((secret_token or "").encode(), TELEGRAM_WEBHOOK_SECRET.encode())
+        return True
 
     async def test_connectivity(self) -> bool:
         """Test basic connectivity to Telegram API"""
@@ -198,6 +360,9 @@ class TelegramMessenger:
                 "url": webhook_url,
                 "allowed_updates": ["message", "callback_query"]
             }
+            if TELEGRAM_WEBHOOK_SECRET:
+                # Telegram echoes it back in X-Telegram-Bot-Api-Secret-Token
+                data["secret_token"] = TELEGRAM_WEBHOOK_SECRET
             result = await self._send_request("setWebhook", data)
             if result and result.get('ok'):
                 logger.info(f"Webhook configured successfully: {webhook_url}")
@@ -223,7 +388,7 @@ class TelegramMessenger:
         Send categorization prompt with inline keyboard buttons.
         Returns message_id for later editing.
         """
-        if not self.chat_id:
+        if not self.bot_token or not self.chat_id:
             return None
         
         gasto_id = gasto.get('id', '')
@@ -232,29 +397,20 @@ class TelegramMessenger:
         fecha = gasto.get('fecha', '')
         
         # Format message with escaped description
-        message_text = f"🧾 *Nuevo gasto por categorizar*\n\n"
-        message_text += f"💰 Monto: ${monto:,.0f} CLP\n"
-        message_text += f"📅 Fecha: {fecha}\n"
-        message_text += f"🏪 Descripción: {self._escape_markdown(descripcion)}\n"
-        
-        if alias_hint:
-            message_text += f"💡 Sugerencia: {alias_hint}\n"
-        
-        message_text += f"\n¿En qué categoría clasificamos este gasto?"
+        hint_line = f"💡 Sugerencia: {alias_hint}\n" if alias_hint else ""
+        message_text = (
+            f"🧾 *Nuevo gasto por categorizar*\n\n"
+            f"💰 Monto: ${monto:,.0f} CLP\n"
+            f"📅 Fecha: {fecha}\n"
+            f"🏪 Descripción: {self._escape_markdown(descripcion)}\n"
+            f"{hint_line}"
+            f"\n¿En qué categoría clasificamos este gasto?"
+        )
         
         # Create inline keyboard with category options
         keyboard = self._create_category_keyboard(gasto_id)
         
-        data = {
-            "chat_id": self.chat_id,
-            "text": message_text,
-            "parse_mode": "Markdown",
-            "reply_markup": {
-                "inline_keyboard": keyboard
-            }
-        }
-        
-        result = await self._send_request("sendMessage", data)
+        result = await self._send_text("sendMessage", message_text, keyboard)
         if result and result.get('ok'):
             return result['result']['message_id']
         return None
@@ -264,7 +420,7 @@ class TelegramMessenger:
         Send sharing prompt after categorization.
         Returns message_id for later editing.
         """
-        if not self.chat_id:
+        if not self.bot_token or not self.chat_id:
             return None
         
         gasto_id = gasto.get('id', '')
@@ -272,95 +428,38 @@ class TelegramMessenger:
         monto = gasto.get('monto_clp', 0)
         categoria = gasto.get('categoria', '')
         
-        message_text = f"✅ *Gasto categorizado como: {self._escape_markdown(categoria)}*\n\n"
-        message_text += f"💰 Monto: ${monto:,.0f} CLP\n"
-        message_text += f"🏪 {self._escape_markdown(descripcion)}\n\n"
-        message_text += f"¿Este gasto fue compartido?"
+        message_text = (
+            f"✅ *Gasto categorizado como: {self._escape_markdown(categoria)}*\n\n"
+            f"💰 Monto: ${monto:,.0f} CLP\n"
+            f"🏪 {self._escape_markdown(descripcion)}\n\n"
+            f"¿Este gasto fue compartido?"
+        )
         
         # Create sharing keyboard
-        keyboard = [
-            [
-                {"text": "❌ No compartido", "callback_data": f"share:{gasto_id}:no"},
-                {"text": "👥 50/50", "callback_data": f"share:{gasto_id}:50"}
-            ],
-            [
-                {"text": "🧑‍🤝‍🧑 Otro %", "callback_data": f"share:{gasto_id}:custom"}
-            ]
-        ]
+        keyboard = _inline_keyboard(SHARE_KEYBOARD_ROWS, "share", gasto_id)
         
-        data = {
-            "chat_id": self.chat_id,
-            "text": message_text,
-            "parse_mode": "Markdown",
-            "reply_markup": {
-                "inline_keyboard": keyboard
-            }
-        }
-        
-        result = await self._send_request("sendMessage", data)
+        result = await self._send_text("sendMessage", message_text, keyboard)
         if result and result.get('ok'):
             return result['result']['message_id']
         return None
     
     def _create_category_keyboard(self, gasto_id: str) -> List[List[Dict[str, str]]]:
         """Create inline keyboard for category selection"""
-        categories = [
-            ("🍽️ Alimentación", "alimentacion"),
-            ("🚗 Transporte", "transporte"),
-            ("🛒 Supermercado", "supermercado"),
-            ("⛽ Combustible", "combustible"),
-            ("🏠 Servicios", "servicios"),
-            ("💊 Salud", "salud"),
-            ("🎬 Entretenimiento", "entretenimiento"),
-            ("👕 Ropa", "ropa"),
-            ("🏠 Hogar", "hogar"),
-            ("📚 Educación", "educacion"),
-            ("🏃 Deportes", "deportes"),
-            ("💻 Tecnología", "tecnologia"),
-            ("🛍️ Compras Online", "comercio_electronico"),
-            ("✈️ Viajes", "viajes"),
-            ("❓ Otros", "otros")
-        ]
-        
-        keyboard = []
-        row = []
-        
-        for display_name, category_key in categories:
-            callback_data = f"cat:{gasto_id}:{category_key}"
-            row.append({"text": display_name, "callback_data": callback_data})
-            
-            if len(row) == 2:  # 2 buttons per row
-                keyboard.append(row)
-                row = []
-        
-        if row:  # Add remaining buttons
-            keyboard.append(row)
-        
-        return keyboard
+        return _inline_keyboard(CATEGORY_KEYBOARD_ROWS, "cat", gasto_id)
     
     async def edit_message(self, message_id: int, text: str, keyboard: Optional[List] = None):
         """Edit an existing message"""
-        if not self.chat_id:
+        if not self.bot_token or not self.chat_id:
             return None
         
-        data = {
-            "chat_id": self.chat_id,
-            "message_id": message_id,
-            "text": text,
-            "parse_mode": "Markdown"
-        }
-        
-        if keyboard:
-            data["reply_markup"] = {"inline_keyboard": keyboard}
-        
-        return await self._send_request("editMessageText", data)
+        return await self._send_text("editMessageText", text, keyboard, message_id)
     
     async def send_confirmation_prompt(self, gasto: Dict[str, Any], confidence: float) -> Optional[int]:
         """
         Send confirmation prompt for auto-categorization.
         Returns message_id for later editing.
         """
-        if not self.chat_id:
+        if not self.bot_token or not self.chat_id:
             return None
         
         gasto_id = gasto.get('id', '')
@@ -370,32 +469,20 @@ class TelegramMessenger:
         fecha = gasto.get('fecha', '')
         
         # Format message with auto-categorization info
-        message_text = f"🤖 *Auto-categorizado con {confidence:.0%} confianza*\n\n"
-        message_text += f"💰 Monto: ${monto:,.0f} CLP\n"
-        message_text += f"📅 Fecha: {fecha}\n"
-        message_text += f"🏪 Descripción: {self._escape_markdown(descripcion)}\n"
-        message_text += f"📂 Categoría sugerida: *{self._escape_markdown(categoria)}*\n\n"
-        message_text += f"¿Es correcta esta categorización?"
+        message_text = (
+            f"🤖 *Auto-categorizado con {confidence:.0%} confianza*\n\n"
+            f"💰 Monto: ${monto:,.0f} CLP\n"
+            f"📅 Fecha: {fecha}\n"
+            f"🏪 Descripción: {self._escape_markdown(descripcion)}\n"
+            f"📂 Categoría sugerida: *{self._escape_markdown(categoria)}*\n\n"
+            f"¿Es correcta esta categorización?"
+        )
         
         # Create confirmation keyboard
-        keyboard = [
-            [
-                {"text": "✅ Correcto", "callback_data": f"confirm:{gasto_id}:yes"},
-                {"text": "❌ Cambiar", "callback_data": f"confirm:{gasto_id}:no"}
-            ]
-        ]
-        
-        data = {
-            "chat_id": self.chat_id,
-            "text": message_text,
-            "parse_mode": "Markdown",
-            "reply_markup": {
-                "inline_keyboard": keyboard
-            }
-        }
+        keyboard = _inline_keyboard(CONFIRM_KEYBOARD_ROWS, "confirm", gasto_id)
         
         logger.info(f"Sending category prompt for gasto_id={gasto_id}")
-        result = await self._send_request("sendMessage", data)
+        result = await self._send_text("sendMessage", message_text, keyboard)
         if result and result.get('ok'):
             logger.info(f"Category prompt sent successfully, message_id={result['result']['message_id']}")
             return result['result']['message_id']
@@ -405,25 +492,29 @@ class TelegramMessenger:
     
     async def send_simple_message(self, text: str):
         """Send a simple text message"""
-        if not self.chat_id:
+        if not self.bot_token or not self.chat_id:
             return None
         
-        data = {
-            "chat_id": self.chat_id,
-            "text": text,
-            "parse_mode": "Markdown"
-        }
-        
-        return await self._send_request("sendMessage", data)
+        return await self._send_text("sendMessage", text)
+
+    async def _send_text(self, method: str, text: str, keyboard: Optional[List] = None,
+                         message_id: Optional[int] = None) -> Optional[Dict]:
+        """Send or edit a Markdown message, attaching an inline keyboard only when given"""
+        data = {"chat_id": self.chat_id, "text": text}
+        if MARKDOWN_SPECIAL.search(text):
+            data["parse_mode"] = "Markdown"
+        if message_id is not None:
+            data["message_id"] = message_id
+        if keyboard is not None:
+            data["reply_markup"] = {"inline_keyboard": keyboard}
+        return await self._send_request(method, data)
 
 async def handle_telegram_update(update: Dict[str, Any], storage, categorizer, secret_token: Optional[str] = None):
     """
     Handle incoming Telegram updates with enhanced validation and error handling.
     Processes category selection, sharing decisions, and text commands.
     """
-    messenger = TelegramMessenger()
-
-    # Validate webhook
+    # Validate webhook (the module-level messenger is reused so its connection pool is too)
     if not messenger.validate_webhook_secret(update, secret_token):
         logger.warning("Invalid webhook received")
         return {"ok": False, "error": "Invalid webhook"}
@@ -441,175 +532,193 @@ async def handle_telegram_update(update: Dict[str, Any], storage, categorizer, s
                 "from_user": callback.get('from', {}).get('id')
             })
 
-            # Answer the callback query to remove loading state
+            # Answer the callback query to remove loading state, concurrently with the work below
             callback_id = callback.get('id')
             if callback_id:
-                await messenger._send_request("answerCallbackQuery", {
+                answer = asyncio.create_task(messenger._send_request("answerCallbackQuery", {
                     "callback_query_id": callback_id
-                })
-            
-            if data.startswith('cat:'):
-                # Category selection: cat:<gid>:<categoria>
-                _, gasto_id, categoria = data.split(':', 2)
-
-                logger.info(f"Processing category selection: gasto_id={gasto_id}, categoria={categoria}")
-
-                # Update expense with category
-                gasto = storage.get(gasto_id)
-                if gasto:
-                    logger.info(f"Found expense: {gasto.get('descripcion', 'N/A')}")
-                    gasto['categoria'] = categoria
-                    gasto['estado'] = 'categorizado'
-
-                    # Auto-categorize to get subcategory
-                    _, subcategoria, _, confidence = categorizer.categorize_one(gasto)
-                    gasto['subcategoria'] = subcategoria
-                    gasto['ml_confidence'] = confidence
-
-                    storage.upsert_row(gasto)
-                    storage.sync_excel()
-
-                    # Edit message to show categorization success
-                    success_text = f"✅ *Gasto categorizado como: {messenger._escape_markdown(categoria)}*\n\n"
-                    success_text += f"💰 ${gasto['monto_clp']:,.0f} CLP\n"
-                    success_text += f"🏪 {messenger._escape_markdown(gasto['descripcion'])}"
-
-                    await messenger.edit_message(message_id, success_text)
+                }))
+            else:
+                answer = None
 
-                    # Ask about sharing
-                    await messenger.send_share_prompt(gasto)
-                    logger.info(f"Category selection processed successfully for gasto_id={gasto_id}")
-                else:
-                    logger.error(f"Expense not found: gasto_id={gasto_id}")
-                    await messenger.send_simple_message(f"❌ Error: Gasto con ID {gasto_id} no encontrado")
-            
-            elif data.startswith('share:'):
-                # Share selection: share:<gid>:<percentage>
-                parts = data.split(':', 2)
-                if len(parts) >= 3:
-                    _, gasto_id, share_type = parts
-                    
-                    gasto = storage.get(gasto_id)
-                    if gasto:
-                        if share_type == 'no':
-                            # Not shared
-                            gasto['porcentaje_compartido'] = 0
-                            gasto['compartido_con'] = ''
-                            gasto['monto_tu_parte'] = gasto['monto_clp']
-                            gasto['monto_tercero'] = 0
-                            
-                            storage.upsert_row(gasto)
-                            storage.sync_excel()
-                            
-                            final_text = f"✅ *Gasto procesado completamente*\n\n"
-                            final_text += f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
-                            final_text += f"💰 Monto: ${gasto['monto_clp']:,.0f} CLP\n"
-                            final_text += f"🏪 {messenger._escape_markdown(gasto['descripcion'])}\n"
-                            final_text += f"👤 No compartido"
-                            
-                            await messenger.edit_message(message_id, final_text)
-                        
-                        elif share_type == '50':
-                            # 50/50 split - ask for person name
-                            instruction_text = f"💬 *Compartido 50/50*\n\n"
-                            instruction_text += f"Responde con: `id {gasto_id} con <Nombre>`\n"
-                            instruction_text += f"Ejemplo: `id {gasto_id} con Juan`"
-                            
-                            await messenger.edit_message(message_id, instruction_text)
-                        
-                        elif share_type == 'custom':
-                            # Custom percentage - ask for details
-                            instruction_text = f"💬 *Porcentaje personalizado*\n\n"
-                            instruction_text += f"Responde con: `id {gasto_id} con <Nombre> % <porcentaje>`\n"
-                            instruction_text += f"Ejemplo: `id {gasto_id} con María % 30`"
-                            
-                            await messenger.edit_message(message_id, instruction_text)
-            
-            elif data.startswith('confirm:'):
-                # Confirmation selection: confirm:<gid>:<yes|no>
-                _, gasto_id, confirmation = data.split(':', 2)
-                
-                gasto = storage.get(gasto_id)
-                if gasto:
-                    if confirmation == 'yes':
-                        # User confirmed auto-categorization
-                        success_text = f"✅ *Categorización confirmada*\n\n"
-                        success_text += f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
-                        success_text += f"💰 Monto: ${gasto['monto_clp']:,.0f} CLP\n"
-                        success_text += f"🏪 {messenger._escape_markdown(gasto['descripcion'])}"
-                        
-                        await messenger.edit_message(message_id, success_text)
-                        
-                        # Sync Excel and ask about sharing
-                        storage.sync_excel()
-                        await messenger.send_share_prompt(gasto)
-                        
-                    elif confirmation == 'no':
-                        # User wants to change categorization - show manual selection
-                        gasto['estado'] = 'pendiente'
-                        storage.upsert_row(gasto)
-                        
-                        await messenger.send_category_prompt(gasto)
-                        
-                        # Edit original message to show it's being re-categorized
-                        recategorize_text = f"🔄 *Recategorizando gasto...*\n\n"
-                        recategorize_text += f"💰 ${gasto['monto_clp']:,.0f} CLP\n"
-                        recategorize_text += f"🏪 {messenger._escape_markdown(gasto['descripcion'])}\n\n"
-                        recategorize_text += f"👆 Selecciona la categoría correcta arriba"
-                        
-                        await messenger.edit_message(message_id, recategorize_text)
+            try:
+                await _handle_callback(data, message_id, storage, categorizer)
+            finally:
+                if answer is not None:
+                    await answer
         
         # Handle text messages
         elif 'message' in update and 'text' in update['message']:
             text = update['message']['text'].strip()
             
-            # Handle income commands: "ingreso <monto> <descripcion>" or "ingreso <monto> <descripcion> de <persona>"
-            if text.startswith('ingreso '):
-                await _handle_income_command(text, storage, messenger)
-            
-            # Handle sharing commands: "id <gid> con <Nombre> [% <porcentaje>]"
-            elif text.startswith('id '):
-                await _handle_sharing_command(text, storage, messenger)
-            
-            # Handle help command
-            elif text.lower() in ['/help', '/ayuda', 'help', 'ayuda']:
-                await _handle_help_command(messenger)
+            # Dispatch on the first word: ingreso, id or a help command
+            command = text.partition(' ')[0]
+            handler = TEXT_COMMANDS.get(command) or TEXT_COMMANDS.get(command.lower())
+            if handler:
+                await handler(text, storage, messenger)
     
     except Exception as e:
-        logger.error(f"Error handling Telegram update: {e}")
-        await messenger.send_simple_message(f"❌ Error procesando comando: {str(e)}")
+        # Runs after the webhook was acknowledged, so log the traceback instead of raising
+        logger.error(f"Error handling Telegram update: {e}", exc_info=True)
+        await messenger.send_simple_message(f"❌ Error procesando comando: {messenger._escape_markdown(str(e))}")
+
+async def _send_concurrently(*calls):
+    """Await independent Telegram calls together, logging failures without cancelling the others"""
+    for result in await asyncio.gather(*calls, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error(f"Telegram call failed: {result}", exc_info=result)
+
+async def _handle_callback(data: str, message_id: int, storage, categorizer):
+    """Process an inline keyboard button press, dispatching "<action>:<gasto_id>:<choice>" by action"""
+    match = CALLBACK_DATA.match(data)
+    handler = CALLBACK_HANDLERS.get(match.group(1)) if match else None
+    if handler is None:
+        logger.warning(f"Ignoring unrecognized callback data: {data}")
+        return
+    _, gasto_id, choice = match.groups()
+    await handler(gasto_id, choice, message_id, storage, categorizer)
+
+async def _handle_category_choice(gasto_id: str, categoria: str, message_id: int, storage, categorizer):
+    """Categorize an expense from the category keyboard and ask whether it was shared"""
+    logger.info(f"Processing category selection: gasto_id={gasto_id}, categoria={categoria}")
+
+    # Update expense with category
+    gasto = storage.get(gasto_id)
+    if gasto and gasto.get('categoria') == categoria and gasto.get('estado') == 'categorizado':
+        # Double tap or redelivered update: already categorized, nothing to redo
+        logger.info(f"Expense already categorized as {categoria}: gasto_id={gasto_id}")
+    elif gasto:
+        logger.info(f"Found expense: {gasto.get('descripcion', 'N/A')}")
+        gasto['categoria'] = categoria
+        gasto['estado'] = 'categorizado'
+
+        # Auto-categorize to get subcategory
+        _, subcategoria, _, confidence = categorizer.categorize_one(gasto)
+        gasto['subcategoria'] = subcategoria
+        gasto['ml_confidence'] = confidence
+
+        await asyncio.to_thread(storage.upsert_row, gasto)
+        storage.schedule_excel_sync()
+
+        # Edit message to show categorization success
+        success_text = (
+            f"✅ *Gasto categorizado como: {messenger._escape_markdown(categoria)}*\n\n"
+            f"💰 ${gasto['monto_clp']:,.0f} CLP\n"
+            f"🏪 {messenger._escape_markdown(gasto['descripcion'])}"
+        )
+
+        # Show the categorization and ask about sharing in parallel
+        await _send_concurrently(
+            messenger.edit_message(message_id, success_text),
+            messenger.send_share_prompt(gasto)
+        )
+        logger.info(f"Category selection processed successfully for gasto_id={gasto_id}")
+    else:
+        logger.error(f"Expense not found: gasto_id={gasto_id}")
+        await messenger.send_simple_message(f"❌ Error: Gasto con ID {gasto_id} no encontrado")
+
+async def _handle_share_choice(gasto_id: str, share_type: str, message_id: int, storage, categorizer):
+    """Apply a sharing choice (no, 50 or custom) from the share keyboard"""
+    gasto = storage.get(gasto_id)
+    if gasto:
+        if share_type == 'no':
+            # Not shared; skip the write when the expense is already stored that way
+            if gasto.get('porcentaje_compartido') or gasto.get('compartido_con'):
+                gasto['porcentaje_compartido'] = 0
+                gasto['compartido_con'] = ''
+                gasto['monto_tu_parte'] = gasto['monto_clp']
+                gasto['monto_tercero'] = 0
+
+                await asyncio.to_thread(storage.upsert_row, gasto)
+                storage.schedule_excel_sync()
+
+            final_text = (
+                f"✅ *Gasto procesado completamente*\n\n"
+                f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
+                f"💰 Monto: ${gasto['monto_clp']:,.0f} CLP\n"
+                f"🏪 {messenger._escape_markdown(gasto['descripcion'])}\n"
+                f"👤 No compartido"
+            )
+
+            await messenger.edit_message(message_id, final_text)
+
+        elif share_type == '50':
+            # 50/50 split - ask for person name
+            instruction_text = (
+                f"💬 *Compartido 50/50*\n\n"
+                f"Responde con: `id {gasto_id} con <Nombre>`\n"
+                f"Ejemplo: `id {gasto_id} con Juan`"
+            )
+
+            await messenger.edit_message(message_id, instruction_text)
+
+        elif share_type == 'custom':
+            # Custom percentage - ask for details
+            instruction_text = (
+                f"💬 *Porcentaje personalizado*\n\n"
+                f"Responde con: `id {gasto_id} con <Nombre> % <porcentaje>`\n"
+                f"Ejemplo: `id {gasto_id} con María % 30`"
+            )
+
+            await messenger.edit_message(message_id, instruction_text)
+
+async def _handle_confirm_choice(gasto_id: str, confirmation: str, message_id: int, storage, categorizer):
+    """Accept an auto-categorization or send the expense back for manual selection"""
+    gasto = storage.get(gasto_id)
+    if gasto:
+        if confirmation == 'yes':
+            # User confirmed auto-categorization
+            success_text = (
+                f"✅ *Categorización confirmada*\n\n"
+                f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
+                f"💰 Monto: ${gasto['monto_clp']:,.0f} CLP\n"
+                f"🏪 {messenger._escape_markdown(gasto['descripcion'])}"
+            )
+
+            # Sync Excel and ask about sharing
+            storage.schedule_excel_sync()
+            await _send_concurrently(
+                messenger.edit_message(message_id, success_text),
+                messenger.send_share_prompt(gasto)
+            )
+
+        elif confirmation == 'no':
+            # User wants to change categorization - show manual selection
+            if gasto.get('estado') != 'pendiente':
+                gasto['estado'] = 'pendiente'
+                await asyncio.to_thread(storage.upsert_row, gasto)
+
+            # Edit original message to show it's being re-categorized
+            recategorize_text = (
+                f"🔄 *Recategorizando gasto...*\n\n"
+                f"💰 ${gasto['monto_clp']:,.0f} CLP\n"
+                f"🏪 {messenger._escape_markdown(gasto['descripcion'])}\n\n"
+                f"👆 Selecciona la categoría correcta arriba"
+            )
+
+            # Send the new category prompt and mark the old message in parallel
+            await _send_concurrently(
+                messenger.send_category_prompt(gasto),
+                messenger.edit_message(message_id, recategorize_text)
+            )
 
 async def _handle_sharing_command(text: str, storage, messenger):
     """Handle sharing command parsing and processing"""
     try:
         # Parse: "id <gid> con <Nombre> [% <porcentaje>]"
-        parts = text.split()
-        
-        if len(parts) < 4 or parts[2] != 'con':
+        match = SHARING_COMMAND.match(text)
+        if not match:
             await messenger.send_simple_message("❌ Formato incorrecto. Usa: `id <ID> con <Nombre>` o `id <ID> con <Nombre> % <porcentaje>`")
             return
         
-        gasto_id = parts[1]
-        
-        # Find percentage if specified
-        percentage = 50  # default 50/50
-        name_parts = []
-        
-        for i, part in enumerate(parts[3:], 3):
-            if part == '%' and i + 1 < len(parts):
-                try:
-                    percentage = float(parts[i + 1])
-                    break
-                except ValueError:
-                    pass
-            else:
-                name_parts.append(part)
+        gasto_id, nombre, porcentaje = match.groups()
         
-        if not name_parts:
+        if not nombre:
             await messenger.send_simple_message("❌ Falta el nombre de la persona")
             return
         
-        nombre = ' '.join(name_parts)
+        nombre = ' '.join(nombre.split())
+        percentage = float(porcentaje) if porcentaje else 50  # default 50/50
         
         # Update expense
         gasto = storage.get(gasto_id)
@@ -619,29 +728,27 @@ async def _handle_sharing_command(text: str, storage, messenger):
         
         gasto['porcentaje_compartido'] = percentage
         gasto['compartido_con'] = nombre
-        
-        # Calculate amounts
-        monto_total = float(gasto['monto_clp'])
-        gasto['monto_tercero'] = monto_total * (percentage / 100)
-        gasto['monto_tu_parte'] = monto_total * ((100 - percentage) / 100)
         gasto['settlement_status'] = 'pending'
         
-        storage.upsert_row(gasto)
-        storage.sync_excel()
+        # upsert_row fills in monto_tu_parte / monto_tercero, so the reply shows the stored split
+        gasto = await asyncio.to_thread(storage.upsert_row, gasto)
+        storage.schedule_excel_sync()
         
         # Confirmation message
-        confirmation = f"✅ *Gasto compartido configurado*\n\n"
-        confirmation += f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
-        confirmation += f"💰 Monto total: ${monto_total:,.0f} CLP\n"
-        confirmation += f"👤 Tu parte: ${gasto['monto_tu_parte']:,.0f} CLP ({100-percentage:.0f}%)\n"
-        confirmation += f"👥 {nombre}: ${gasto['monto_tercero']:,.0f} CLP ({percentage:.0f}%)\n"
-        confirmation += f"⏳ Estado: Pendiente de cobro"
+        confirmation = (
+            f"✅ *Gasto compartido configurado*\n\n"
+            f"📊 Categoría: {messenger._escape_markdown(gasto['categoria'])}\n"
+            f"💰 Monto total: ${gasto['monto_clp']:,.0f} CLP\n"
+            f"👤 Tu parte: ${gasto['monto_tu_parte']:,.0f} CLP ({percentage:.0f}%)\n"
+            f"👥 {messenger._escape_markdown(nombre)}: ${gasto['monto_tercero']:,.0f} CLP ({100-percentage:.0f}%)\n"
+            f"⏳ Estado: Pendiente de cobro"
+        )
         
         await messenger.send_simple_message(confirmation)
     
     except Exception as e:
         logger.error(f"Error in sharing command: {e}")
-        await messenger.send_simple_message(f"❌ Error procesando comando: {str(e)}")
+        await messenger.send_simple_message(f"❌ Error procesando comando: {messenger._escape_markdown(str(e))}")
 
 async def _handle_income_command(text: str, storage, messenger):
     """Handle income command parsing and processing"""
@@ -651,7 +758,7 @@ async def _handle_income_command(text: str, storage, messenger):
         
         if len(parts) < 3:
             await messenger.send_simple_message(
-                "❌ Formato incorrecto\\. Usa:\n\n"
+                "❌ Formato incorrecto. Usa:\n\n"
                 "`ingreso 50000 Sueldo septiembre`\n"
                 "`ingreso 15000 Reembolso cena de Juan`\n"
                 "`ingreso 25000 Freelance proyecto X`"
@@ -686,10 +793,11 @@ async def _handle_income_command(text: str, storage, messenger):
         
         # Create income record
         from datetime import datetime
+        now = datetime.now()  # one timestamp for the record and the confirmation
         ingreso_data = {
             "descripcion": descripcion,
             "monto_clp": monto,
-            "fecha": datetime.now().isoformat(),
+            "fecha": now.isoformat(),
             "categoria": "ingreso",
             "tipo": "transfer_in",
             "estado": "procesado",
@@ -702,7 +810,7 @@ async def _handle_income_command(text: str, storage, messenger):
             ingreso_data["compartido_con"] = contraparte
         
         # Save income
-        saved_ingreso = storage.upsert_row(ingreso_data)
+        saved_ingreso = await asyncio.to_thread(storage.upsert_row, ingreso_data)
         
         # Try auto-matching if there's a counterpart
         matched_expense = None
@@ -716,49 +824,61 @@ async def _handle_income_command(text: str, storage, messenger):
             )
             
             if matched_expense:
-                reconcile.mark_as_settled(matched_expense["id"], saved_ingreso["id"], storage)
+                await asyncio.to_thread(reconcile.mark_as_settled, matched_expense["id"], saved_ingreso["id"], storage)
         
         # Sync Excel
-        storage.sync_excel()
+        storage.schedule_excel_sync()
         
         # Send confirmation
-        confirmation = f"✅ *Ingreso registrado*\n\n"
-        confirmation += f"💰 Monto: ${monto:,.0f} CLP\n"
-        confirmation += f"📝 Descripción: {messenger._escape_markdown(descripcion)}\n"
-        confirmation += f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+        # Optional blocks are collected and joined once
+        parts = [
+            f"✅ *Ingreso registrado*\n\n"
+            f"💰 Monto: ${monto:,.0f} CLP\n"
+            f"📝 Descripción: {messenger._escape_markdown(descripcion)}\n"
+            f"📅 Fecha: {now.strftime('%Y-%m-%d %H:%M')}\n"
+        ]
         
         if contraparte:
-            confirmation += f"👤 De: {messenger._escape_markdown(contraparte)}\n"
+            parts.append(f"👤 De: {messenger._escape_markdown(contraparte)}\n")
         
         if matched_expense:
-            confirmation += f"\n🔗 *Auto\\-emparejado con gasto:*\n"
-            confirmation += f"💸 {messenger._escape_markdown(matched_expense['descripcion'])}\n"
-            confirmation += f"💰 ${matched_expense['monto_clp']:,.0f} CLP\n"
-            confirmation += f"✅ Liquidado automáticamente"
+            parts.append(
+                f"\n🔗 *Auto-emparejado con gasto:*\n"
+                f"💸 {messenger._escape_markdown(matched_expense['descripcion'])}\n"
+                f"💰 ${matched_expense['monto_clp']:,.0f} CLP\n"
+                f"✅ Liquidado automáticamente"
+            )
         elif contraparte:
-            confirmation += f"\n💡 *Tip:* Si esto es un reembolso, buscaré automáticamente gastos pendientes de {messenger._escape_markdown(contraparte)}"
+            parts.append(f"\n💡 *Tip:* Si esto es un reembolso, buscaré automáticamente gastos pendientes de {messenger._escape_markdown(contraparte)}")
         
-        await messenger.send_simple_message(confirmation)
+        await messenger.send_simple_message("".join(parts))
         
     except Exception as e:
         logger.error(f"Error in income command: {e}")
-        await messenger.send_simple_message(f"❌ Error procesando ingreso: {str(e)}")
+        await messenger.send_simple_message(f"❌ Error procesando ingreso: {messenger._escape_markdown(str(e))}")
 
-async def _handle_help_command(messenger):
+async def _handle_help_command(text: str, storage, messenger):
     """Send help message with available commands"""
-    help_text = f"🤖 *Comandos disponibles:*\n\n"
-    help_text += f"💰 *Ingresos:*\n"
-    help_text += f"`ingreso 50000 Sueldo septiembre`\n"
-    help_text += f"`ingreso 15000 Reembolso cena de Juan`\n\n"
-    help_text += f"🤝 *Gastos compartidos:*\n"
-    help_text += f"`id ABC123 con Juan`\n"
-    help_text += f"`id ABC123 con María % 30`\n\n"
-    help_text += f"ℹ️ *Notas:*\n"
-    help_text += f"• Los gastos se agregan automáticamente via MacroDroid\n"
-    help_text += f"• Los ingresos 'de alguien' intentan emparejarse automáticamente\n"
-    help_text += f"• Usa `/help` para ver este mensaje"
-    
-    await messenger.send_simple_message(help_text)
+    await messenger.send_simple_message(HELP_TEXT)
+
+# Callback query handlers keyed by the callback data's action prefix
+CALLBACK_HANDLERS = {
+    'cat': _handle_category_choice,
+    'share': _handle_share_choice,
+    'confirm': _handle_confirm_choice
+}
+
+# Text command handlers keyed by the message's first word
+TEXT_COMMANDS = {
+    # "ingreso <monto> <descripcion>" or "ingreso <monto> <descripcion> de <persona>"
+    'ingreso': _handle_income_command,
+    # "id <gid> con <Nombre> [% <porcentaje>]"
+    'id': _handle_sharing_command,
+    '/help': _handle_help_command,
+    '/ayuda': _handle_help_command,
+    'help': _handle_help_command,
+    'ayuda': _handle_help_command
+}
 
 # Instantiate global messenger for easy access
 messenger = TelegramMessenger()